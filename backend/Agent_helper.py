@@ -1,54 +1,204 @@
+import hashlib
+import os
 import re
+import threading
+import time
 import traceback
+from collections import OrderedDict
 import boto3
 import json
+from botocore.exceptions import ClientError
+
+# Agent identifiers (get these from Bedrock console)
+AGENT_ID = "IKXDLL0K7W"
+AGENT_ALIAS_ID = "DY9KWQNAGM"
+
+VERDICT_TTL_SECONDS = int(os.environ.get('RELEVANCE_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+VERDICT_CACHE_SIZE = int(os.environ.get('RELEVANCE_CACHE_SIZE', '10000'))
+# Set to 0 to keep verdicts only in process memory
+VERDICT_CACHE_USE_DB = os.environ.get('RELEVANCE_CACHE_USE_DB', '1') == '1'
+
+# SP relevance criteria: keyword/theme weights. Positive terms are operational
+# signals, negative terms mark content that is clearly out of scope.
+SP_CRITERIA = {
+    'police': 2, 'arrest': 3, 'arrested': 3, 'murder': 4, 'theft': 3, 'robbery': 3, 'atm': 2,
+    'protest': 3, 'rally': 2, 'agitation': 3, 'clash': 3, 'riot': 4, 'violence': 3, 'bandh': 3,
+    'vip': 3, 'minister': 1, 'chief minister': 2, 'security': 2, 'crime': 3, 'ganja': 3,
+    'smuggling': 3, 'accident': 2, 'kidnap': 4, 'fraud': 2, 'cyber': 2, 'dharna': 3, 'blockade': 3,
+    'cricket': -2, 'box office': -3, 'film review': -3, 'horoscope': -4, 'recipe': -4,
+    'sensex': -3, 'stock market': -3, 'fashion': -3,
+}
+# Retried by the caller with backoff (raw_data_handler.call_with_backoff) instead of being swallowed
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException', 'Throttling', 'RequestLimitExceeded'}
+
+ACCEPT_SCORE = 8  # at or above: relevant without asking the agent
+REJECT_SCORE = -3  # at or below: not relevant without asking the agent
+
+_CRITERIA_PATTERN = re.compile(r'\b(' + '|'.join(re.escape(term) for term in sorted(SP_CRITERIA, key=len, reverse=True)) + r')\b')
+
+_client_lock = threading.Lock()
+_bedrock_agent = None
+
+
+def get_bedrock_agent():
+    """Shared bedrock-agent-runtime client; boto3 clients are safe to use across threads"""
+    global _bedrock_agent
+    with _client_lock:
+        if _bedrock_agent is None:
+            _bedrock_agent = boto3.client("bedrock-agent-runtime", region_name="us-east-1")  # replace with your region
+    return _bedrock_agent
+
+
+def content_hash(article):
+    """Hash of the normalised story text, so syndicated copies and re-uploads share a key"""
+    text = article.get('Content') or article.get('Title') or ''
+    normalised = re.sub(r'\s+', ' ', text).strip().lower()
+    return hashlib.sha256(normalised.encode('utf-8')).hexdigest()
+
+
+def criteria_score(article):
+    """Weighted keyword score of an article against SP_CRITERIA, with the matched terms"""
+    text = f"{article.get('Title', '')} {article.get('Content', '')}".lower()
+    matches = _CRITERIA_PATTERN.findall(text)
+    return sum(SP_CRITERIA[term] for term in set(matches)), sorted(set(matches))
+
+
+class VerdictCache:
+    """
+    Relevance verdicts keyed by content hash, with TTL and size-bounded LRU eviction.
+
+    An in-process LRU serves warm invocations; the relevance_verdicts table
+    (see migrations/) shares verdicts across containers and re-uploads.
+    """
+
+    def __init__(self, max_size=VERDICT_CACHE_SIZE, ttl_seconds=VERDICT_TTL_SECONDS, use_db=VERDICT_CACHE_USE_DB):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.use_db = use_db
+        self._entries = OrderedDict()  # content_hash -> (is_relevant, stored_at)
+        self._lock = threading.Lock()
+
+    def _db_execute(self, query, params):
+        """Run a query on a pooled connection; a failed query is logged and skipped"""
+        if not self.use_db:
+            return None
+        try:
+            from Utils import pg_connection
+            with pg_connection() as conn, conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchone() if cursor.description else None
+        except Exception as e:
+            print(f"Relevance cache database query failed, using memory only for this lookup: {e}")
+            return None
+
+    def get(self, key):
+        # The lock guards only the in-memory LRU; database round trips run unlocked
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.time() - entry[1] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+        row = self._db_execute(
+            """SELECT is_relevant FROM relevance_verdicts
+               WHERE content_hash = %s AND created_at > now() - make_interval(secs => %s)""",
+            (key, self.ttl_seconds))
+        if row is not None:
+            with self._lock:
+                self._remember(key, row[0])
+            return row[0]
+        return None
+
+    def put(self, key, is_relevant, score=None):
+        with self._lock:
+            self._remember(key, is_relevant)
+        self._db_execute(
+            """INSERT INTO relevance_verdicts (content_hash, is_relevant, relevance_score)
+               VALUES (%s, %s, %s)
+               ON CONFLICT (content_hash) DO UPDATE SET
+                   is_relevant = EXCLUDED.is_relevant,
+                   relevance_score = EXCLUDED.relevance_score,
+                   created_at = now()""",
+            (key, is_relevant, score))
+
+    def _remember(self, key, is_relevant):
+        self._entries[key] = (is_relevant, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+_verdict_cache = VerdictCache()
+
+
+def ask_agent(article, session_id):
+    """Invoke the Bedrock agent; returns (is_relevant, relevance_score), score None if no verdict was parsed"""
+    is_relevant, score = True, None
+    # Call the agent
+    response = get_bedrock_agent().invoke_agent(
+        agentId=AGENT_ID,
+        agentAliasId=AGENT_ALIAS_ID,
+        sessionId=session_id,
+        inputText=article['Content']
+    )
+
+    # Read the response stream
+    print("Response from Bedrock Agent:")
+    print(response)
+    for event in response["completion"]:
+        print("Event:", event)
+        if "chunk" in event:
+            print("Processing chunk...")
+            print("Chunk ID:", event["chunk"])
+            payload = event["chunk"]["bytes"]
+            chunk_str = payload.decode("utf-8")
+            match = re.search(r"\{.*\}", chunk_str, re.DOTALL)
+            if match:
+                print("Found JSON block in chunk")
+                print("JSON Block:", match.group(0))
+                json_block = match.group(0)
+                parsed_json = json.loads(json_block)
+                print("Parsed JSON:", parsed_json)
+                score = parsed_json.get("relevance_score", 0)
+                is_relevant = score > 0.5
+                print("Is relevant:", is_relevant)
+                print(parsed_json.get("relevance_score", "No content found"))
+            else:
+                print("❌ No JSON found in response")
+    return is_relevant, score
+
 
 def is_relevance(article):
+    """Relevance verdict: cache first, then the local keyword pre-filter, then the Bedrock agent
+
+    Throttling errors are raised so the caller can back off and retry; any
+    other agent failure counts the article as relevant.
+    """
+    key = content_hash(article)
+    cached = _verdict_cache.get(key)
+    if cached is not None:
+        print(f"Relevance cache hit for {article.get('Title')}: {cached}")
+        return cached
+
+    score, matched = criteria_score(article)
+    if score >= ACCEPT_SCORE or score <= REJECT_SCORE:
+        is_relevant = score >= ACCEPT_SCORE
+        print(f"Pre-filter {'accepted' if is_relevant else 'rejected'} {article.get('Title')} (score {score}, terms {matched})")
+        _verdict_cache.put(key, is_relevant)
+        return is_relevant
+
     is_relevant = True
     try:
-    # Initialize Bedrock Agent Runtime client
-        bedrock_agent = boto3.client("bedrock-agent-runtime", region_name="us-east-1")  # replace with your region
-
-        # Agent identifiers (get these from Bedrock console)
-        agent_id = "IKXDLL0K7W"
-        agent_alias_id = "DY9KWQNAGM"
-        
-        # Your dynamic user message (e.g., relationship analysis prompt)
-        user_input = article['Content']
-
-        # Call the agent
-        response = bedrock_agent.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId="news-analysis-session-001",
-            inputText=user_input
-        )
-        
-    # Read the response stream
-   
-        print("Response from Bedrock Agent:")
-        print(response)
-        for event in response["completion"]:
-            print("Event:", event)
-            if "chunk" in event:
-                print("Processing chunk...")
-                print("Chunk ID:", event["chunk"])
-                payload = event["chunk"]["bytes"]
-                chunk_str = payload.decode("utf-8")
-                match = re.search(r"\{.*\}", chunk_str, re.DOTALL)
-                if match:
-                    print("Found JSON block in chunk")
-                    print("JSON Block:", match.group(0))
-                    json_block = match.group(0)
-                    parsed_json = json.loads(json_block)
-                    print("Parsed JSON:", parsed_json)
-                    is_relevant = parsed_json.get("relevance_score", 0) > 0.5
-                    print("Is relevant:", is_relevant)
-                    print(parsed_json.get("relevance_score", "No content found"))
-                else:
-                    print("❌ No JSON found in response")
+        # One session per story so verdicts do not leak context between articles
+        is_relevant, agent_score = ask_agent(article, session_id=f"news-{key[:32]}")
+        if agent_score is not None:
+            _verdict_cache.put(key, is_relevant, agent_score)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+            raise
+        print("Error processing response:", e)
     except Exception as e:
-            print("Error processing response:", e)
-            pass
+        print("Error processing response:", e)
         # traceback.print_exc()
     return is_relevant
@@ -0,0 +1,31 @@
+import datetime
+
+# published_date formats besides ISO 8601; the README specifies DD/MM/YYYY and
+# uploaded .docx files carry the date line as written
+DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d %B %Y', '%d %b %Y', '%B %d, %Y', '%b %d, %Y')
+
+
+def parse_published_date(value):
+    """datetime of a published_date value (datetime, date or date string); None if unparseable"""
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, str) and value.strip():
+        text = ' '.join(value.split())
+        try:
+            return datetime.datetime.fromisoformat(text)
+        except ValueError:
+            pass
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(text, date_format)
+            except ValueError:
+                continue
+    return None
+
+
+def iso_date(value):
+    """published_date as stored: YYYY-MM-DD, or None if unparseable"""
+    parsed = parse_published_date(value)
+    return parsed.date().isoformat() if parsed else None
@@ -0,0 +1,167 @@
+import base64
+import datetime
+import decimal
+import itertools
+import json
+import uuid
+import zlib
+
+# orjson and brotli are optional: without them responses fall back to the
+# stdlib encoder and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROW_BATCH_SIZE = 500
+# Bodies smaller than this are sent uncompressed; the encoding overhead is not worth it
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value):
+    """Encode the database types json cannot handle natively"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """JSON-encode payload to bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def iter_json_rows(cursor, batch_size=ROW_BATCH_SIZE):
+    """
+    Yield a JSON array of the cursor's rows, as objects keyed by column name, in chunks.
+
+    Rows are fetched and encoded batch by batch, so the full result set never
+    exists as a list of dicts. Works with named (server-side) cursors too.
+    """
+    yield b'['
+    columns = None
+    first = True
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if columns is None:
+            # Named cursors only describe their columns after the first fetch
+            columns = [desc[0] for desc in cursor.description]
+        encoded = dumps([dict(zip(columns, row)) for row in rows])
+        yield (b'' if first else b',') + encoded[1:-1]
+        first = False
+    yield b']'
+
+
+def _header(event, name):
+    headers = (event or {}).get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def negotiate_encoding(event):
+    """Best supported Content-Encoding for the request's Accept-Encoding, or None"""
+    accepted = {}
+    for part in (_header(event, 'Accept-Encoding') or '').split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.strip().lower()] = quality
+
+    supported = ('br', 'gzip') if brotli is not None else ('gzip',)
+    candidates = [(accepted.get(encoding, accepted.get('*', 0.0)), -rank, encoding) for rank, encoding in enumerate(supported)]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def _compress(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return b''.join([compressor.process(chunk) for chunk in chunks] + [compressor.finish()])
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return b''.join([compressor.compress(chunk) for chunk in chunks] + [compressor.flush()])
+
+
+def json_response(event, status_code, payload=None, chunks=None, headers=None):
+    """
+    API Gateway proxy response with a JSON body.
+
+    Pass either payload (any JSON-able object) or chunks (e.g. from
+    iter_json_rows). The body is compressed with the encoding negotiated from
+    the request's Accept-Encoding and then returned base64-encoded, which
+    API Gateway decodes before sending.
+    """
+    chunks = iter([dumps(payload)] if chunks is None else chunks)
+    # Read just enough to know whether compression is worthwhile
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= MIN_COMPRESS_BYTES:
+            break
+
+    response_headers = {"Content-Type": "application/json", "Vary": "Accept-Encoding"}
+    response_headers.update(headers or {})
+    encoding = negotiate_encoding(event) if size >= MIN_COMPRESS_BYTES else None
+    if encoding is None:
+        return {
+            "statusCode": status_code,
+            "headers": response_headers,
+            "body": b''.join(head + list(chunks)).decode('utf-8')
+        }
+
+    response_headers["Content-Encoding"] = encoding
+    body = _compress(itertools.chain(head, chunks), encoding)
+    return {
+        "statusCode": status_code,
+        "headers": response_headers,
+        "isBase64Encoded": True,
+        "body": base64.b64encode(body).decode('ascii')
+    }
+
+
+
+def etag_matches(event, etag):
+    """True when the request's If-None-Match already names this ETag"""
+    header = _header(event, 'If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak comparison: W/"x" and "x" name the same representation
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag.removeprefix('W/') in candidates
+
+
+def not_modified_response(etag, headers=None):
+    response_headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    response_headers.update(headers or {})
+    return {
+        "statusCode": 304,
+        "headers": response_headers,
+        "body": ""
+    }
@@ -14,7 +14,6 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from Utils import get_postgresql_connection
 app = FastAPI()
 
 s3 = boto3.client('s3')
@@ -37,8 +36,6 @@ def lambda_handler(event, context):
         # Parse multipart form
         multipart_data = decoder.MultipartDecoder(body, content_type)
         print(f"Multipart data parts: {len(multipart_data.parts)}")
-        conn = get_postgresql_connection()
-        cursor = conn.cursor()
         for part in multipart_data.parts:
             print(f"Processing part: {part.headers.get(b'Content-Disposition')}")
             file_stream = io.BytesIO(part.content)
@@ -1,25 +1,144 @@
 import json
+import os
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
-def get_postgresql_connection():
+from psycopg2 import pool
+
+# pg_config.json is looked up in the working directory first, then next to this file
+CONFIG_PATHS = ("pg_config.json", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pg_config.json"))
+# Connections kept open between invocations; psycopg2 closes any returned beyond this
+POOL_MIN_CONNECTIONS = int(os.environ.get('PG_POOL_MIN', '2'))
+POOL_MAX_CONNECTIONS = int(os.environ.get('PG_POOL_MAX', '4'))
+# How long a caller waits for a free connection once all POOL_MAX_CONNECTIONS are borrowed
+POOL_WAIT_SECONDS = float(os.environ.get('PG_POOL_WAIT_SECONDS', '30'))
+# Connections idle longer than this are pinged before reuse (a frozen Lambda's sockets can go stale)
+HEALTH_CHECK_AFTER_SECONDS = float(os.environ.get('PG_HEALTH_CHECK_SECONDS', '30'))
+
+
+def load_config():
     '''get the creds from local config'''
+    for path in CONFIG_PATHS:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            continue
+    print("PostgreSQL config pg_config.json not found")
+    return None
+
+
+_config = load_config()
+_pool = None
+_pool_lock = threading.Lock()
+_returned_at = {}  # id(connection) -> time it was last put back
+# psycopg2's getconn raises PoolError when the pool is exhausted instead of
+# waiting; borrowers queue on this semaphore for a free slot instead
+_slots = threading.BoundedSemaphore(POOL_MAX_CONNECTIONS)
+
+
+def get_pool():
+    """Shared connection pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            if _config is None:
+                raise psycopg2.OperationalError("PostgreSQL config pg_config.json not found")
+            _pool = pool.ThreadedConnectionPool(min(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS), POOL_MAX_CONNECTIONS, **_config)
+    return _pool
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    returned_at = _returned_at.get(id(conn))
+    # Connections the pool has just opened have never been returned and need no ping
+    if returned_at is None or time.time() - returned_at < HEALTH_CHECK_AFTER_SECONDS:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def _checkout():
+    """Borrow a live connection, discarding stale ones"""
+    connection_pool = get_pool()
+    for _ in range(POOL_MAX_CONNECTIONS + 1):
+        conn = connection_pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        print("Discarding stale PostgreSQL connection")
+        _returned_at.pop(id(conn), None)
+        connection_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("could not obtain a healthy PostgreSQL connection")
 
+
+def _checkin(conn, broken=False):
+    broken = broken or conn.closed
+    _returned_at.pop(id(conn), None)
+    if not broken:
+        _returned_at[id(conn)] = time.time()
+    get_pool().putconn(conn, close=broken)
+
+
+@contextmanager
+def pg_connection():
+    """
+    Borrow a pooled PostgreSQL connection for the duration of a with-block.
+
+    When all connections are borrowed the caller waits up to POOL_WAIT_SECONDS
+    for one to come back.
+
+    The transaction is committed when the block exits normally and rolled back
+    if it raises; the connection then goes back to the pool, so warm Lambda
+    invocations skip the connect/TLS/auth handshake.
+    """
+    if not _slots.acquire(timeout=POOL_WAIT_SECONDS):
+        raise pool.PoolError(f"no PostgreSQL connection free after {POOL_WAIT_SECONDS}s")
+    try:
+        conn = _checkout()
+    except BaseException:
+        _slots.release()
+        raise
+    broken = False
+    try:
+        yield conn
+        if not conn.closed:
+            conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        try:
+            _checkin(conn, broken)
+        finally:
+            _slots.release()
+
+
+def get_postgresql_connection():
     """
-    Establish a connection to a PostgreSQL database.
+    Establish a dedicated (unpooled) connection to the PostgreSQL database.
 
-    Parameters:
-    host (str): The hostname of the PostgreSQL server.
-    database (str): The name of the database to connect to.
-    user (str): The username to connect with.
-    password (str): The password for the user.
+    Prefer pg_connection() in handlers; this is kept for scripts that own
+    their connection and close it themselves.
 
     Returns:
-    psycopg2.extensions.connection: A connection object to the PostgreSQL database.
+    psycopg2.extensions.connection: A connection object to the PostgreSQL database, or None on error.
     """
     try:
-        with open("pg_config.json") as f:
-            config = json.load(f)
-        conn = psycopg2.connect(**config)
+        if _config is None:
+            return None
+        conn = psycopg2.connect(**_config)
         return conn
     except psycopg2.Error as e:
         print("Error connecting to PostgreSQL database:", e)
-        return None
\ No newline at end of file
+        return None
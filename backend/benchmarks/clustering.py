@@ -0,0 +1,99 @@
+"""Runtime, peak memory and clustering quality of the k-NN DBSCAN backend against sklearn's dense DBSCAN.
+
+The legacy path (dense features, brute-force DBSCAN) is only run up to
+--legacy-max articles; beyond that it is the part that runs out of memory.
+
+Usage:
+    python benchmarks/clustering.py --n 5000 20000 100000
+    python benchmarks/clustering.py --method tfidf --n 2000 10000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy.sparse as sp
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'clustering_service')))
+
+from cluster_backends import knn_dbscan, reduce_tfidf
+from index_factory import normalize_embeddings
+
+
+def synthetic_embeddings(n, dim, n_topics=200, noise=0.02, seed=0):
+    """Unit vectors scattered around topic centres, with their topic labels"""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, n)
+    return normalize_embeddings(topics[labels] + noise * rng.normal(size=(n, dim)).astype(np.float32)), labels
+
+
+def synthetic_tfidf(n, n_features=5000, n_topics=50, topic_terms=30, terms_per_doc=15, noise_terms=3, seed=0):
+    """Sparse L2-normalised rows whose terms come mostly from a per-topic vocabulary, with their topic labels"""
+    rng = np.random.default_rng(seed)
+    vocabularies = rng.integers(0, n_features, (n_topics, topic_terms))
+    labels = rng.integers(0, n_topics, n)
+    own = vocabularies[labels[:, None], rng.integers(0, topic_terms, (n, terms_per_doc))]
+    noise = rng.integers(0, n_features, (n, noise_terms))
+    cols = np.hstack([own, noise]).ravel()
+    rows = np.repeat(np.arange(n), terms_per_doc + noise_terms)
+    matrix = sp.csr_matrix((np.ones(len(cols), dtype=np.float32), (rows, cols)), shape=(n, n_features))
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    return sp.csr_matrix(sp.diags(1 / np.maximum(norms, 1e-12)) @ matrix), labels
+
+
+def legacy_clusters(features, eps, min_samples):
+    from sklearn.cluster import DBSCAN
+    dense = features.toarray() if sp.issparse(features) else features
+    return DBSCAN(eps=eps, min_samples=min_samples).fit_predict(dense)
+
+
+def scalable_clusters(features, eps, min_samples):
+    if sp.issparse(features):
+        features = reduce_tfidf(features)
+    return knn_dbscan(features, eps=eps, min_samples=min_samples)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = fn(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return labels, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, nargs='+', default=[2000, 10000, 50000])
+    parser.add_argument('--method', choices=('semantic', 'tfidf'), default='semantic')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--eps', type=float, default=0.5)
+    parser.add_argument('--min-samples', type=int, default=2)
+    parser.add_argument('--legacy-max', type=int, default=10000)
+    args = parser.parse_args()
+
+    from sklearn.metrics import adjusted_rand_score
+    # ARI is measured against the synthetic topic labels
+    print(f"{'n':>8} {'backend':>10} {'seconds':>9} {'peak MB':>9} {'clusters':>9} {'noise':>7} {'ARI':>6}")
+    for n in args.n:
+        if args.method == 'semantic':
+            features, topics = synthetic_embeddings(n, args.dim)
+        else:
+            features, topics = synthetic_tfidf(n)
+
+        runs = [('knn', scalable_clusters)]
+        if n <= args.legacy_max:
+            runs.insert(0, ('legacy', legacy_clusters))
+        for name, fn in runs:
+            labels, seconds, peak = measure(fn, features, args.eps, args.min_samples)
+            n_clusters = len(set(labels.tolist()) - {-1})
+            print(f"{n:>8} {name:>10} {seconds:>9.2f} {peak / 1e6:>9.1f} {n_clusters:>9} {int(np.sum(labels == -1)):>7} "
+                  f"{adjusted_rand_score(topics, labels):>6.3f}")
+
+
+if __name__ == '__main__':
+    main()
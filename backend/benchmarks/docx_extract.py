@@ -0,0 +1,91 @@
+"""Throughput and peak memory of the streaming .docx extractor against the legacy join-then-regex one.
+
+Usage:
+    python benchmarks/docx_extract.py --articles 5000
+    python benchmarks/docx_extract.py --file clippings.docx
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+import numpy as np
+from docx import Document
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'raw_data_handler')))
+
+from docx_stream import iter_articles
+
+LEGACY_PATTERN = re.compile(
+    r'Title:\s*(.*?)\s*Source:\s*(.*?)\s*Date:\s*(.*?)\s*(?=(?:\d{1,2}\)|Title:)|\Z)',
+    re.DOTALL
+)
+
+
+def legacy_extract(file_stream):
+    """The previous extractor: python-docx, one joined string, one regex over it"""
+    doc = Document(file_stream)
+    text = "\n".join(p.text for p in doc.paragraphs)
+    articles = []
+    for title, source, rest in LEGACY_PATTERN.findall(text):
+        date_parts = rest.strip().split("\n", 1)
+        articles.append({
+            "Title": title.strip(),
+            "Source": source.strip(),
+            "Date": date_parts[0].strip(),
+            "Content": date_parts[1].strip() if len(date_parts) > 1 else ""
+        })
+    return articles
+
+
+def synthetic_docx(n_articles, paragraphs_per_article=6, seed=0):
+    """A newspaper-dump style .docx of numbered Title/Source/Date articles"""
+    rng = np.random.default_rng(seed)
+    words = ['police', 'district', 'minister', 'protest', 'village', 'officials', 'said', 'on', 'the', 'in', 'road', 'rally']
+    doc = Document()
+    for i in range(n_articles):
+        doc.add_paragraph(f"{i % 99 + 1}) Title: Story {i} {' '.join(rng.choice(words, 6))}")
+        doc.add_paragraph(f"Source: Paper {i % 7}")
+        doc.add_paragraph(f"Date: 2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+        for _ in range(rng.integers(1, paragraphs_per_article + 1)):
+            doc.add_paragraph(' '.join(rng.choice(words, 80)))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(extract, data):
+    tracemalloc.start()
+    start = time.perf_counter()
+    articles = list(extract(io.BytesIO(data)))
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return articles, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--file', help='benchmark an existing .docx instead of a synthetic one')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            data = f.read()
+    else:
+        data = synthetic_docx(args.articles)
+    print(f"Document: {len(data) / 1e6:.1f} MB compressed")
+
+    results = {}
+    for name, extract in (('legacy', legacy_extract), ('streaming', iter_articles)):
+        articles, seconds, peak = measure(extract, data)
+        results[name] = articles
+        print(f"{name:>10}: {len(articles):6d} articles  {seconds:7.2f}s  {len(articles) / seconds:8.0f} articles/s  peak {peak / 1e6:7.1f} MB")
+    print(f"Outputs identical: {results['legacy'] == results['streaming']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Throughput of the embedding backends and their drift from the float32 PyTorch model.
+
+Drift is the cosine similarity between each text's embedding and the
+reference one, and the overlap of every text's top-k neighbours.
+
+Usage:
+    python benchmarks/embedding_backends.py --n 2000
+    python benchmarks/embedding_backends.py --backends torch onnx-int8 --threads 2
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'clustering_service')))
+
+from article_batch import article_text
+from encoders import ENCODER_BACKENDS, Encoder
+from index_factory import normalize_embeddings
+
+WORDS = ('police arrested two men for atm theft in visakhapatnam minister announced relief for flood hit '
+         'villages protest rally blocked the national highway cyber fraud gang busted in guntur district '
+         'collector reviewed security arrangements ahead of chief minister visit').split()
+
+
+def synthetic_texts(n, seed=0):
+    """Article texts shaped like the indexer's input: weighted title plus entity fields of varying length"""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(n):
+        title = ' '.join(rng.choice(WORDS, rng.integers(5, 15)))
+        entities = ','.join(rng.choice(WORDS, rng.integers(0, 40)))
+        texts.append(article_text(title, entities, entities[:len(entities) // 2], ' '.join(rng.choice(WORDS, 8))))
+    return texts
+
+
+def top_k_overlap(reference, candidate, k=10):
+    """Mean fraction of each text's k nearest neighbours that both embeddings agree on"""
+    def neighbours(embeddings):
+        scores = embeddings @ embeddings.T
+        np.fill_diagonal(scores, -np.inf)
+        return np.argpartition(-scores, k, axis=1)[:, :k]
+    ref, cand = neighbours(reference), neighbours(candidate)
+    return np.mean([len(set(a) & set(b)) / k for a, b in zip(ref.tolist(), cand.tolist())])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=2000)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--backends', nargs='+', default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS)
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.n)
+    reference_encoder = Encoder(args.model, 'torch', threads=args.threads)
+
+    # The previous path: one encode call with the default fixed batch size
+    start = time.perf_counter()
+    reference = normalize_embeddings(np.asarray(reference_encoder.model.encode(texts, convert_to_numpy=True), dtype=np.float32))
+    baseline_seconds = time.perf_counter() - start
+    print(f"{'backend':>22} {'texts/s':>9} {'speedup':>8} {'mean cos':>9} {'min cos':>8} {'top10 overlap':>14}")
+    print(f"{'torch (fixed batch)':>22} {args.n / baseline_seconds:>9.0f} {1.0:>8.2f} {1.0:>9.4f} {1.0:>8.4f} {1.0:>14.3f}")
+
+    for backend in args.backends:
+        encoder = reference_encoder if backend == 'torch' else Encoder(args.model, backend, threads=args.threads)
+        encoder.encode(texts[:32])  # warm-up
+        start = time.perf_counter()
+        embeddings = normalize_embeddings(encoder.encode(texts))
+        seconds = time.perf_counter() - start
+        cosines = np.sum(embeddings * reference, axis=1)
+        print(f"{backend:>22} {args.n / seconds:>9.0f} {baseline_seconds / seconds:>8.2f} {cosines.mean():>9.4f} "
+              f"{cosines.min():>8.4f} {top_k_overlap(reference, embeddings):>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
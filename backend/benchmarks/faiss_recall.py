@@ -0,0 +1,54 @@
+"""Recall-versus-latency report of the FAISS index ladder against exact search.
+
+Usage:
+    python benchmarks/faiss_recall.py --n 200000 --dim 384
+    python benchmarks/faiss_recall.py --embedding-cache /tmp/embedding_cache
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'clustering_service')))
+
+from index_factory import choose_index_spec, print_recall_report, recall_report
+
+
+def synthetic_embeddings(n, dim, n_topics=200, noise=0.35, seed=0):
+    """Clustered vectors that mimic topic structure in news embeddings"""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, n)
+    return topics[labels] + noise * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def cached_embeddings(directory):
+    """Load the vectors of an EmbeddingStore directory"""
+    from embedding_store import EmbeddingStore
+    import json
+    with open(os.path.join(directory, EmbeddingStore.SIDECAR_FILE)) as f:
+        meta = json.load(f)
+    store = EmbeddingStore(directory, meta['model'])
+    return np.asarray(store._vectors()[[row for row, _ in store.rows.values()]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--embedding-cache', help='use real embeddings from an EmbeddingStore directory')
+    args = parser.parse_args()
+
+    if args.embedding_cache:
+        embeddings = cached_embeddings(args.embedding_cache)
+    else:
+        embeddings = synthetic_embeddings(args.n, args.dim)
+    n, d = embeddings.shape
+    print(f"{n} vectors, dim {d}; default choice: {choose_index_spec(n, d)}")
+    print_recall_report(recall_report(embeddings, k=args.k, n_queries=args.queries), k=args.k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Build time, PageRank time, neighbour lookup and memory of the CSR ArticleGraph against networkx.
+
+Both graphs get the same k-NN similarity edges, with one node per article
+carrying the article dict as networkx node attributes, as the indexer used to.
+
+Usage:
+    python benchmarks/graph_pagerank.py --n 10000 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'clustering_service')))
+
+from article_graph import ArticleGraph
+from faiss_recall import synthetic_embeddings
+from index_factory import build_index, choose_index_spec, normalize_embeddings, set_search_params
+
+K = 5
+SIMILARITY_THRESHOLD = 0.3
+
+
+def knn_edges(embeddings):
+    index = build_index(embeddings, choose_index_spec(*embeddings.shape))
+    set_search_params(index)
+    scores, ids = index.search(embeddings, K + 1)
+    rows, cols = np.nonzero((ids >= 0) & (ids != np.arange(len(ids))[:, None]) & (scores > SIMILARITY_THRESHOLD))
+    return rows, ids[rows, cols], scores[rows, cols]
+
+
+def build_networkx(n, sources, targets, weights):
+    import networkx as nx
+    graph = nx.Graph()
+    for i in range(n):
+        graph.add_node(i, article_id=str(i), title=f"Article {i}", location_mentions='visakhapatnam')
+    graph.add_weighted_edges_from(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+    return graph
+
+
+def build_csr(n, sources, targets, weights):
+    graph = ArticleGraph(n_nodes=n)
+    graph.add_edges(sources, targets, weights, n_nodes=n)
+    return graph
+
+
+def timed(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    import networkx as nx
+    print(f"{'n':>8} {'graph':>9} {'build s':>9} {'build MB':>9} {'pagerank s':>11} {'lookup us':>10}")
+    for n in args.n:
+        embeddings = normalize_embeddings(synthetic_embeddings(n, args.dim))
+        edges = knn_edges(embeddings)
+        queries = np.random.default_rng(0).integers(0, n, args.lookups)
+
+        graph, build_seconds, build_peak = timed(build_networkx, n, *edges)
+        reference, pagerank_seconds, _ = timed(nx.pagerank, graph)
+        start = time.perf_counter()
+        for q in queries.tolist():
+            sorted(((m, graph[q][m]['weight']) for m in graph.neighbors(q)), key=lambda x: x[1], reverse=True)[:K]
+        lookup = (time.perf_counter() - start) / len(queries) * 1e6
+        print(f"{n:>8} {'networkx':>9} {build_seconds:>9.2f} {build_peak / 1e6:>9.1f} {pagerank_seconds:>11.2f} {lookup:>10.1f}")
+        del graph
+
+        graph, build_seconds, build_peak = timed(build_csr, n, *edges)
+        ranks, pagerank_seconds, _ = timed(graph.pagerank)
+        start = time.perf_counter()
+        for q in queries.tolist():
+            graph.neighbors(q)[0][:K]
+        lookup = (time.perf_counter() - start) / len(queries) * 1e6
+        print(f"{n:>8} {'csr':>9} {build_seconds:>9.2f} {build_peak / 1e6:>9.1f} {pagerank_seconds:>11.2f} {lookup:>10.1f}")
+
+        difference = np.abs(ranks - np.array([reference[i] for i in range(n)])).max()
+        print(f"{'':>8} max |PageRank difference| {difference:.2e}, {graph.n_edges} edges, "
+              f"{len(graph.components())} story chains")
+
+
+if __name__ == '__main__':
+    main()
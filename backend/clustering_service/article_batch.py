@@ -0,0 +1,101 @@
+import numpy as np
+
+# Columns of the articles table that the clustering service reads
+ARTICLE_COLUMNS = ('article_id', 'title', 'location_mentions', 'officials_involved', 'relevance_category', 'published_date')
+
+TITLE_WEIGHT = 2  # Give title more importance
+
+
+def article_text(title, location_mentions, officials_involved, relevance_category, title_weight=TITLE_WEIGHT):
+    """Text used for embeddings and TF-IDF: the title repeated, then the entity fields"""
+    # Missing fields contribute nothing rather than the string 'None'
+    return f"{' '.join([title or ''] * title_weight)} {location_mentions or ''} {officials_involved or ''} {relevance_category or ''}"
+
+
+class ArticleBatch:
+    """
+    Columnar batch of articles keyed by the articles table's column names.
+
+    Each column is a NumPy object array, so batches can be filtered, sliced and
+    concatenated without building a dict per article. Indexing with an int
+    returns a single article as a dict for callers that still want one.
+    """
+
+    def __init__(self, columns=None, column_names=ARTICLE_COLUMNS):
+        columns = columns or {}
+        n = len(next(iter(columns.values()))) if columns else 0
+        self.columns = {}
+        for name in dict.fromkeys(tuple(column_names) + tuple(columns)):
+            values = columns.get(name)
+            if isinstance(values, np.ndarray) and values.dtype == object:
+                self.columns[name] = values
+            elif values is None:
+                self.columns[name] = np.full(n, None, dtype=object)
+            else:
+                # fromiter keeps list-valued cells (e.g. arrays) as single objects
+                self.columns[name] = np.fromiter(values, dtype=object, count=n)
+
+    @classmethod
+    def from_rows(cls, rows, column_names=ARTICLE_COLUMNS):
+        """Build a batch from DB rows in column_names order, transposing in one pass"""
+        values = list(zip(*rows)) if rows else [()] * len(column_names)
+        return cls(dict(zip(column_names, values)), column_names)
+
+    @classmethod
+    def from_records(cls, records, column_names=ARTICLE_COLUMNS):
+        """Build a batch from a list of article dicts"""
+        names = list(dict.fromkeys(tuple(column_names) + tuple(key for record in records for key in record)))
+        return cls({name: [record.get(name) for record in records] for name in names}, names)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls()
+        names = list(dict.fromkeys(name for batch in batches for name in batch.columns))
+        return cls({name: np.concatenate([batch.column(name) for batch in batches]) for name in names}, names)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return {name: values[key] for name, values in self.columns.items()}
+        # Slices, index arrays and boolean masks select a sub-batch
+        return ArticleBatch({name: values[key] for name, values in self.columns.items()}, list(self.columns))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def column(self, name):
+        if name in self.columns:
+            return self.columns[name]
+        return np.full(len(self), None, dtype=object)
+
+    def extend(self, other):
+        """Append another batch (or list of article dicts) in place"""
+        self.columns = ArticleBatch.concat([self, as_article_batch(other)]).columns
+
+    def texts(self, title_weight=TITLE_WEIGHT):
+        """Preprocessed text for every article, built in a single pass over the columns"""
+        return [
+            article_text(title, location_mentions, officials_involved, relevance_category, title_weight)
+            for title, location_mentions, officials_involved, relevance_category in zip(
+                self.column('title'),
+                self.column('location_mentions'),
+                self.column('officials_involved'),
+                self.column('relevance_category'),
+            )
+        ]
+
+    def to_columns(self):
+        """Plain {column: list} mapping, e.g. for JSON"""
+        return {name: values.tolist() for name, values in self.columns.items()}
+
+
+def as_article_batch(articles):
+    """Accept an ArticleBatch or a list of article dicts"""
+    if isinstance(articles, ArticleBatch):
+        return articles
+    return ArticleBatch.from_records(list(articles))
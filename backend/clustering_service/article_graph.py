@@ -0,0 +1,98 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+
+class ArticleGraph:
+    """
+    Undirected weighted article graph stored as a symmetric CSR adjacency matrix.
+
+    Nodes are article positions in the indexer; edge weights are cosine
+    similarities. Neighbour lookup is a slice of the CSR arrays, and PageRank
+    and connected components run on the sparse matrix directly.
+    """
+
+    def __init__(self, adjacency=None, n_nodes=0):
+        if adjacency is None:
+            adjacency = sp.csr_matrix((n_nodes, n_nodes), dtype=np.float32)
+        self.adjacency = adjacency
+
+    @classmethod
+    def from_arrays(cls, data, indices, indptr):
+        n = len(indptr) - 1
+        return cls(sp.csr_matrix((data, indices, indptr), shape=(n, n)))
+
+    @property
+    def n_nodes(self):
+        return self.adjacency.shape[0]
+
+    @property
+    def n_edges(self):
+        return self.adjacency.nnz // 2  # no self loops, each edge stored both ways
+
+    def add_edges(self, sources, targets, weights, n_nodes=None):
+        """Add undirected edges, growing the node set to n_nodes; an existing edge keeps the larger weight"""
+        n = max(n_nodes or 0, self.n_nodes)
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+        keep = sources != targets
+        low, high, weights = np.minimum(sources, targets)[keep], np.maximum(sources, targets)[keep], weights[keep]
+        # The same pair can come from both endpoints' searches; keep one copy, the heaviest
+        order = np.lexsort((-weights, high, low))
+        low, high, weights = low[order], high[order], weights[order]
+        first = np.ones(len(low), dtype=bool)
+        first[1:] = (low[1:] != low[:-1]) | (high[1:] != high[:-1])
+        low, high, weights = low[first], high[first], weights[first]
+        edges = sp.csr_matrix(
+            (np.concatenate([weights, weights]), (np.concatenate([low, high]), np.concatenate([high, low]))),
+            shape=(n, n),
+        )
+        adjacency = self.adjacency
+        if adjacency.shape != (n, n):
+            adjacency = sp.csr_matrix((adjacency.data, adjacency.indices,
+                                       np.concatenate([adjacency.indptr, np.full(n - adjacency.shape[0], adjacency.indptr[-1])])),
+                                      shape=(n, n))
+        self.adjacency = adjacency.maximum(edges).tocsr().astype(np.float32)
+
+    def neighbors(self, node):
+        """(neighbour ids, weights) of a node, strongest first"""
+        start, stop = self.adjacency.indptr[node], self.adjacency.indptr[node + 1]
+        ids, weights = self.adjacency.indices[start:stop], self.adjacency.data[start:stop]
+        order = np.argsort(-weights, kind='stable')
+        return ids[order], weights[order]
+
+    def pagerank(self, alpha=0.85, tol=1.0e-6, max_iter=100):
+        """Weighted PageRank by power iteration; same conventions as networkx.pagerank
+
+        Dangling nodes (no edges) spread their rank uniformly, and iteration stops
+        once the L1 change drops below n_nodes * tol.
+        """
+        n = self.n_nodes
+        if n == 0:
+            return np.zeros(0)
+        strength = np.asarray(self.adjacency.sum(axis=1)).ravel()
+        dangling = strength == 0
+        inverse_strength = np.divide(1.0, strength, out=np.zeros_like(strength), where=~dangling)
+        # The adjacency is symmetric, so A.T @ (x / strength) is A @ (x / strength)
+        adjacency = self.adjacency.astype(np.float64)
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            previous = rank
+            rank = alpha * (adjacency @ (previous * inverse_strength))
+            rank += (alpha * previous[dangling].sum() + 1 - alpha) / n
+            if np.abs(rank - previous).sum() < n * tol:
+                break
+        else:
+            print(f"PageRank did not converge in {max_iter} iterations")
+        return rank
+
+    def components(self, min_size=2):
+        """Connected components (story chains) with at least min_size articles, largest first"""
+        if self.n_nodes == 0:
+            return []
+        _, labels = connected_components(self.adjacency, directed=False)
+        order = np.argsort(labels, kind='stable')
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        groups = [group for group in np.split(order, boundaries) if len(group) >= min_size]
+        groups.sort(key=len, reverse=True)
+        return groups
@@ -0,0 +1,92 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from index_factory import DEFAULT_MEMORY_BUDGET_MB, build_index, choose_index_spec, normalize_embeddings, set_search_params
+
+DBSCAN_NEIGHBORS = 32  # neighbours fetched per article; bounds memory at n * k
+SVD_COMPONENTS = 128
+SEARCH_BATCH_SIZE = 4096
+
+
+def reduce_tfidf(tfidf_matrix, n_components=SVD_COMPONENTS, random_state=42):
+    """Dense float32 LSA features of a sparse TF-IDF matrix, unit length per row
+
+    TruncatedSVD works on the sparse matrix directly, so memory is
+    n x n_components instead of n x vocabulary.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    n_components = min(n_components, tfidf_matrix.shape[1] - 1, tfidf_matrix.shape[0] - 1)
+    if n_components < 1:
+        return normalize_embeddings(np.asarray(sp.csr_matrix(tfidf_matrix).todense(), dtype=np.float32))
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    return normalize_embeddings(svd.fit_transform(tfidf_matrix).astype(np.float32))
+
+
+def knn_graph(features, k, index=None, batch_size=SEARCH_BATCH_SIZE):
+    """(similarities, neighbour ids) of every row's k nearest neighbours by inner product
+
+    Uses the given FAISS index over the same features, or builds one sized by
+    index_factory. Missing neighbours are returned with id -1.
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    if index is None:
+        index = build_index(features, choose_index_spec(len(features), features.shape[1], DEFAULT_MEMORY_BUDGET_MB))
+        set_search_params(index)
+    k = min(k, len(features))
+    similarities = np.empty((len(features), k), dtype=np.float32)
+    neighbours = np.empty((len(features), k), dtype=np.int64)
+    for start in range(0, len(features), batch_size):
+        stop = start + batch_size
+        similarities[start:stop], neighbours[start:stop] = index.search(features[start:stop], k)
+    return similarities, neighbours
+
+
+def knn_dbscan(features, eps=0.5, min_samples=2, k=DBSCAN_NEIGHBORS, index=None):
+    """
+    DBSCAN over unit-length features driven by a k-nearest-neighbour search.
+
+    eps is a Euclidean radius, as in sklearn's DBSCAN; on unit vectors it is
+    the cosine similarity 1 - eps^2 / 2. Each point's neighbourhood is
+    truncated to its k nearest neighbours, which is exact while no point has
+    more than k neighbours within eps. Core points are linked through their
+    core neighbours with connected components, border points join the cluster
+    of their nearest core neighbour, and the rest are noise (-1).
+    """
+    n = len(features)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+    similarities, neighbours = knn_graph(features, max(k, min_samples), index)
+    within = (similarities >= 1 - eps ** 2 / 2) & (neighbours >= 0)
+
+    # A point is its own neighbour; the count includes it as sklearn's does
+    is_core = within.sum(axis=1) >= min_samples
+
+    rows, cols = np.nonzero(within)
+    targets = neighbours[rows, cols]
+    core_edges = is_core[rows] & is_core[targets]
+    graph = sp.coo_matrix(
+        (np.ones(int(core_edges.sum()), dtype=np.int8), (rows[core_edges], targets[core_edges])), shape=(n, n)
+    )
+    _, components = connected_components(graph, directed=False)
+
+    core = np.flatnonzero(is_core)
+    _, labels[core] = np.unique(components[core], return_inverse=True)
+
+    # Border points: the first (most similar) core neighbour within eps
+    border = np.flatnonzero(~is_core)
+    if len(border):
+        candidate = within[border] & is_core[np.maximum(neighbours[border], 0)]
+        has_core = candidate.any(axis=1)
+        first = candidate.argmax(axis=1)
+        anchors = neighbours[border[has_core], first[has_core]]
+        labels[border[has_core]] = labels[anchors]
+    return labels
+
+
+def minibatch_kmeans(features, n_clusters, batch_size=SEARCH_BATCH_SIZE, random_state=42):
+    """KMeans labels fitted on mini-batches; works on dense or sparse features"""
+    from sklearn.cluster import MiniBatchKMeans
+    clusterer = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, n_init=3, random_state=random_state)
+    return clusterer.fit_predict(features)
@@ -1,56 +1,177 @@
 import os
 import sys
+import queue
+import threading
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
+import scipy.sparse as sp
 import faiss
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import networkx as nx
 from collections import defaultdict
-import pickle
+from psycopg2.extras import execute_values
 import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from Utils import get_postgresql_connection
+from Utils import get_postgresql_connection, pg_connection
+from article_graph import ArticleGraph
+from article_batch import ARTICLE_COLUMNS, ArticleBatch, article_text, as_article_batch
+from embedding_store import EmbeddingStore
+from encoders import DEFAULT_BACKEND, DEFAULT_THREADS, get_encoder, model_id
+from index_factory import (
+    DEFAULT_EF_SEARCH,
+    DEFAULT_MEMORY_BUDGET_MB,
+    DEFAULT_NPROBE,
+    build_index,
+    choose_index_spec,
+    index_family,
+    normalize_embeddings,
+    set_search_params,
+)
+from cluster_backends import DBSCAN_NEIGHBORS, SVD_COMPONENTS, knn_dbscan, minibatch_kmeans, reduce_tfidf
+from trending import TREND_WINDOW_HOURS, TrendingClusterer, to_timestamp
+
+INDEX_SCHEMA_VERSION = 3
+
 
 class NewsArticleIndexer:
     """
     Multi-algorithm news article indexer with various similarity detection methods
     """
     
-    def __init__(self, embedding_model='all-MiniLM-L6-v2', use_gpu=False):
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(embedding_model)
-        if use_gpu:
-            self.embedding_model = self.embedding_model.cuda()
+    TFIDF_REFIT_GROWTH = 2  # refit TF-IDF once the corpus grows by this factor
+    INDEX_RETRAIN_GROWTH = 4  # retrain IVF indices once the corpus grows by this factor
+    TFIDF_PARAMS = {
+        'max_features': 5000,
+        'stop_words': 'english',
+        'ngram_range': (1, 2),  # Include bigrams
+        'min_df': 1,
+        'max_df': 0.95,
+    }
+    
+    def __init__(self, embedding_model='all-MiniLM-L6-v2', use_gpu=False, embedding_cache_dir=None,
+                 embedding_backend=DEFAULT_BACKEND, embedding_threads=DEFAULT_THREADS,
+                 index_memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH,
+                 trend_window_hours=TREND_WINDOW_HOURS):
+        # Embedding model is loaded lazily on the first encode
+        self.embedding_model_name = embedding_model
+        self.embedding_backend = embedding_backend
+        self.embedding_threads = embedding_threads
+        self.use_gpu = use_gpu
+        
+        # Optional on-disk cache so unchanged articles are not re-encoded
+        self.embedding_store = EmbeddingStore(embedding_cache_dir, self.embedding_model_id) if embedding_cache_dir else None
             
         # Initialize various indexing structures
-        self.articles = []
+        self.articles = ArticleBatch()
         self.embeddings = None
         self.faiss_index = None
+        self.index_spec = None
+        self.index_memory_budget_mb = index_memory_budget_mb
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self._index_trained_size = 0
         self.tfidf_vectorizer = None
         self.tfidf_matrix = None
+        self._tfidf_matrix_t = None  # transposed CSR for similarity products, built on first use
+        self._tfidf_fit_size = 0
         self.graph = None
+        self.trend_window_hours = trend_window_hours
+        self.trending = None
         
+    @property
+    def encoder(self):
+        return get_encoder(self.embedding_model_name, self.embedding_backend, self.use_gpu, self.embedding_threads)
+    
+    @property
+    def embedding_model_id(self):
+        """Model and backend the stored embeddings come from"""
+        return model_id(self.embedding_model_name, self.embedding_backend)
+    
     def add_articles(self, articles):
-        """Add articles to the indexer"""
+        """Add articles (an ArticleBatch or list of dicts), indexing only the new batch once indices exist"""
+        articles = as_article_batch(articles)
+        if not len(articles):
+            return
+        if self.faiss_index is None:
+            self.articles.extend(articles)
+            self._build_indices()
+            return
+        
+        start = len(self.articles)
         self.articles.extend(articles)
-        self._build_indices()
+        texts = articles.texts()
+        
+        print(f"Encoding {len(texts)} new articles...")
+        new_embeddings = self._encode(articles, texts)
+        self.embeddings = np.vstack([self.embeddings, new_embeddings])
+        
+        print("Updating FAISS index...")
+        self._update_faiss_index(new_embeddings)
+        
+        print("Updating TF-IDF index...")
+        self._update_tfidf_index(texts)
+        
+        print("Updating article graph...")
+        self._update_article_graph(range(start, len(self.articles)))
+        
+        print("Updating trending topics...")
+        self._update_trending(start)
     
     def preprocess_text(self, article):
         """Enhanced preprocessing for better relevance"""
-        # Combine title (weighted more heavily) and content
-        title_weight = 2  # Give title more importance
-        return f"{' '.join([article['title']] * title_weight)} {article.get('location_mention', '')} {article.get('officals_involved', '')} {article.get('relevance_category', '')}"
+        # Combine title (weighted more heavily) and the entity columns
+        return article_text(
+            article['title'],
+            article.get('location_mentions'),
+            article.get('officials_involved'),
+            article.get('relevance_category'),
+        )
+
+    def _encode_texts(self, texts):
+        """Encode texts into a float32 embedding matrix"""
+        return self.encoder.encode(texts)
+    
+    def _encode(self, articles, texts):
+        """Encode articles into unit-length embeddings, reusing cached ones whose text is unchanged"""
+        if self.embedding_store is None:
+            return normalize_embeddings(self._encode_texts(texts))
+        keys = articles.column('article_id')
+        return normalize_embeddings(self.embedding_store.get_or_encode(keys, texts, self._encode_texts))
 
-    def _build_indices(self):
-        """Build all indexing structures"""
-        texts = [self.preprocess_text(article) for article in self.articles]
+    def add_article_batches(self, batches):
+        """Add articles from an iterable of batches, encoding each batch as it arrives
+        
+        The remaining indices are built once after the last batch, so a streamed
+        load costs the same as a single add_articles call over the whole corpus.
+        """
+        if self.faiss_index is not None:
+            for batch in batches:
+                self.add_articles(batch)
+            return
+        
+        embeddings = []
+        batches_seen = []
+        for batch in batches:
+            batch = as_article_batch(batch)
+            if not len(batch):
+                continue
+            print(f"Encoding batch of {len(batch)} articles...")
+            embeddings.append(self._encode(batch, batch.texts()))
+            batches_seen.append(batch)
+        self.articles = ArticleBatch.concat(batches_seen)
+        if embeddings:
+            self._build_indices(embeddings=np.vstack(embeddings))
+    
+    def _build_indices(self, embeddings=None):
+        """Build all indexing structures, encoding the articles unless embeddings are given"""
+        texts = self.articles.texts()
         
         # 1. SEMANTIC EMBEDDINGS (Best for semantic similarity)
-        print("Building semantic embeddings...")
-        self.embeddings = self.embedding_model.encode(texts, convert_to_tensor=True)
+        if embeddings is None:
+            print("Building semantic embeddings...")
+            embeddings = self._encode(self.articles, texts)
+        self.embeddings = embeddings
         
         # 2. FAISS INDEX (Best for large-scale retrieval)
         print("Building FAISS index...")
@@ -63,200 +184,617 @@ class NewsArticleIndexer:
         # 4. GRAPH-BASED (Best for discovering article networks)
         print("Building article graph...")
         self._build_article_graph()
+        
+        # 5. TRENDING (rolling window of recent articles)
+        print("Building trending topics...")
+        self.trending = None
+        self._update_trending()
     
     def _build_faiss_index(self):
         """Build FAISS index for fast similarity search"""
-        d = self.embeddings.shape[1]
-        
-        # For small datasets: IndexFlatL2 (exact search)
-        # For large datasets: IndexIVFFlat (approximate search)
-        if len(self.articles) < 10000:
-            self.faiss_index = faiss.IndexFlatL2(d)
+        # Flat (exact) for small corpora, then HNSW / IVF / IVF+SQ / IVF+PQ as the
+        # corpus outgrows the memory budget; see index_factory.choose_index_spec
+        n, d = self.embeddings.shape
+        self.index_spec = choose_index_spec(n, d, self.index_memory_budget_mb)
+        print(f"Using FAISS index {self.index_spec} for {n} articles")
+        self.faiss_index = build_index(self.embeddings, self.index_spec)
+        set_search_params(self.faiss_index, nprobe=self.nprobe, ef_search=self.ef_search)
+        self._index_trained_size = n
+    
+    def _update_faiss_index(self, new_embeddings):
+        """Add new embeddings to the FAISS index, rebuilding only when the chosen index type changes"""
+        n, d = self.embeddings.shape
+        spec = choose_index_spec(n, d, self.index_memory_budget_mb)
+        outgrown = not self.faiss_index.is_trained or (
+            self.index_spec.startswith('IVF') and n >= self.INDEX_RETRAIN_GROWTH * self._index_trained_size
+        )
+        if index_family(spec) != index_family(self.index_spec) or outgrown:
+            # The rebuild reuses the stored embeddings; nothing is re-encoded
+            self._build_faiss_index()
         else:
-            # Use IVF for larger datasets
-            nlist = min(100, len(self.articles) // 10)  # number of clusters
-            quantizer = faiss.IndexFlatL2(d)
-            self.faiss_index = faiss.IndexIVFFlat(quantizer, d, nlist)
-            # Train the index
-            self.faiss_index.train(self.embeddings.cpu().numpy())
-        
-        self.faiss_index.add(self.embeddings.cpu().numpy())
+            self.faiss_index.add(new_embeddings)
     
     def _build_tfidf_index(self, texts):
         """Build TF-IDF index for keyword-based similarity"""
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2),  # Include bigrams
-            min_df=1,
-            max_df=0.95
-        )
+        self.tfidf_vectorizer = TfidfVectorizer(**self.TFIDF_PARAMS)
         self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(texts)
+        self._tfidf_matrix_t = None
+        self._tfidf_fit_size = len(texts)
+    
+    def _update_tfidf_index(self, texts):
+        """Append new documents to the TF-IDF matrix using the fitted vocabulary"""
+        # Refit only when the corpus has doubled since the last fit, so the
+        # vocabulary and IDF weights follow the archive at amortised O(batch) cost
+        if len(self.articles) >= self.TFIDF_REFIT_GROWTH * self._tfidf_fit_size:
+            self._build_tfidf_index(self.articles.texts())
+        else:
+            new_matrix = self.tfidf_vectorizer.transform(texts)
+            self.tfidf_matrix = sp.vstack([self.tfidf_matrix, new_matrix], format='csr')
+            self._tfidf_matrix_t = None
+    
+    def _tfidf_corpus_t(self):
+        """Transposed TF-IDF matrix as CSR, cached until the matrix changes"""
+        if self._tfidf_matrix_t is None:
+            self._tfidf_matrix_t = self.tfidf_matrix.T.tocsr()
+        return self._tfidf_matrix_t
     
     def _build_article_graph(self, similarity_threshold=0.3):
         """Build graph of related articles"""
-        self.graph = nx.Graph()
-        
-        # Add all articles as nodes
-        for i, article in enumerate(self.articles):
-            self.graph.add_node(i, **article)
-        
-        # Add edges based on similarity
-        for i in range(len(self.articles)):
-            similar_articles = self.find_similar_semantic(i, k=5, return_scores=True)
-            for j, score in similar_articles:
-                if i != j and score > similarity_threshold:
-                    self.graph.add_edge(i, j, weight=score)
+        self.graph = ArticleGraph(n_nodes=len(self.articles))
+        self._update_article_graph(range(len(self.articles)), similarity_threshold)
+    
+    def _update_article_graph(self, indices, similarity_threshold=0.3):
+        """Add nodes and their similarity edges for the given article indices"""
+        indices = np.asarray(indices, dtype=np.int64)
+        
+        # Edges are undirected, so linking each new node to its neighbours
+        # also updates the neighbours' adjacency
+        neighbour_ids, neighbour_scores = self.find_similar_semantic_batch(indices, k=5)
+        rows, cols = np.nonzero((neighbour_ids >= 0) & (neighbour_scores > similarity_threshold))
+        self.graph.add_edges(indices[rows], neighbour_ids[rows, cols], neighbour_scores[rows, cols], n_nodes=len(self.articles))
     
     # ===== SIMILARITY SEARCH METHODS =====
     
+    def find_similar_semantic_batch(self, query_indices, k=5, batch_size=4096):
+        """Find similar articles for many queries with one FAISS search per batch
+        
+        Returns (ids, scores) arrays of shape (len(query_indices), k) with the
+        query article itself removed; missing neighbours are padded with id -1.
+        """
+        query_indices = np.asarray(query_indices, dtype=np.int64)
+        ids = np.full((len(query_indices), k), -1, dtype=np.int64)
+        scores = np.zeros((len(query_indices), k), dtype=np.float32)
+        
+        for start in range(0, len(query_indices), batch_size):
+            batch = query_indices[start:start + batch_size]
+            distances, indices = self.faiss_index.search(self.embeddings[batch], k + 1)
+            
+            # Stable-sort the self matches to the end of each row, then drop the extra column
+            order = np.argsort(indices == batch[:, None], axis=1, kind='stable')[:, :k]
+            batch_ids = np.take_along_axis(indices, order, axis=1)
+            batch_scores = np.take_along_axis(distances, order, axis=1)  # Inner product of unit vectors = cosine
+            batch_scores[batch_ids < 0] = 0
+            
+            ids[start:start + len(batch)] = batch_ids
+            scores[start:start + len(batch)] = batch_scores
+        
+        return ids, scores
+    
     def find_similar_semantic(self, query_idx, k=5, return_scores=False):
         """Find similar articles using semantic embeddings (BEST for meaning)"""
-        query_embedding = self.embeddings[query_idx].cpu().numpy().reshape(1, -1)
+        ids, scores = self.find_similar_semantic_batch([query_idx], k=k)
         
-        # Search using FAISS
-        distances, indices = self.faiss_index.search(query_embedding, k + 1)
-        
-        # Remove the query article itself
         results = []
-        for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx != query_idx:
-                similarity_score = 1 / (1 + dist)  # Convert distance to similarity
-                if return_scores:
-                    results.append((idx, similarity_score))
-                else:
-                    results.append(idx)
-                if len(results) >= k:
-                    break
+        for idx, similarity_score in zip(ids[0], scores[0]):
+            if idx < 0:
+                break
+            if return_scores:
+                results.append((idx, similarity_score))
+            else:
+                results.append(idx)
         
         return results
     
+    def find_similar_tfidf_batch(self, query_indices, k=5, max_block_cells=2 ** 22):
+        """Find similar articles for many queries using chunked sparse TF-IDF products
+        
+        Returns (ids, scores) arrays of shape (len(query_indices), k) with the
+        query article itself removed; missing neighbours are padded with id -1.
+        """
+        query_indices = np.asarray(query_indices, dtype=np.int64)
+        n = self.tfidf_matrix.shape[0]
+        ids = np.full((len(query_indices), k), -1, dtype=np.int64)
+        scores = np.zeros((len(query_indices), k), dtype=np.float32)
+        top_k = min(k, n - 1)
+        if top_k <= 0:
+            return ids, scores
+        
+        # TF-IDF rows are L2-normalised, so the sparse dot product is the cosine similarity.
+        # Queries are processed in blocks so the dense similarity block stays bounded.
+        corpus_t = self._tfidf_corpus_t()
+        block_size = max(1, max_block_cells // n)
+        for start in range(0, len(query_indices), block_size):
+            batch = query_indices[start:start + block_size]
+            similarities = (self.tfidf_matrix[batch] @ corpus_t).toarray()
+            similarities[np.arange(len(batch)), batch] = -np.inf
+            
+            # argpartition selects the top-k in linear time; only those k are sorted
+            top = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            
+            ids[start:start + len(batch), :top_k] = np.take_along_axis(top, order, axis=1)
+            scores[start:start + len(batch), :top_k] = np.take_along_axis(top_scores, order, axis=1)
+        
+        return ids, scores
+    
     def find_similar_tfidf(self, query_idx, k=5, return_scores=False):
         """Find similar articles using TF-IDF (BEST for keywords)"""
-        query_vector = self.tfidf_matrix[query_idx]
-        similarities = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+        ids, scores = self.find_similar_tfidf_batch([query_idx], k=k)
         
-        # Get top-k similar articles (excluding self)
-        similar_indices = similarities.argsort()[::-1]
         results = []
-        
-        for idx in similar_indices:
-            if idx != query_idx and len(results) < k:
-                if return_scores:
-                    results.append((idx, similarities[idx]))
-                else:
-                    results.append(idx)
+        for idx, similarity_score in zip(ids[0], scores[0]):
+            if idx < 0:
+                break
+            if return_scores:
+                results.append((idx, similarity_score))
+            else:
+                results.append(idx)
         
         return results
     
+    def find_similar_hybrid_batch(self, query_indices, k=5, semantic_weight=0.7):
+        """Hybrid semantic + TF-IDF neighbours for many queries
+        
+        Returns (ids, scores) arrays of shape (len(query_indices), k) padded with id -1.
+        """
+        query_indices = np.asarray(query_indices, dtype=np.int64)
+        semantic_ids, semantic_scores = self.find_similar_semantic_batch(query_indices, k=k*2)
+        tfidf_ids, tfidf_scores = self.find_similar_tfidf_batch(query_indices, k=k*2)
+        
+        # Combine scores: sum the weighted candidates that share a (query, article) key
+        candidate_ids = np.hstack([semantic_ids, tfidf_ids])
+        candidate_scores = np.hstack([semantic_weight * semantic_scores, (1 - semantic_weight) * tfidf_scores])
+        candidate_rows = np.repeat(np.arange(len(query_indices)), candidate_ids.shape[1])
+        valid = candidate_ids.ravel() >= 0
+        
+        n = len(self.articles)
+        keys, inverse = np.unique(candidate_rows[valid] * n + candidate_ids.ravel()[valid], return_inverse=True)
+        combined = np.bincount(inverse, weights=candidate_scores.ravel()[valid])
+        rows, cols = keys // n, keys % n
+        
+        # Sort by combined score within each query row and keep the first k
+        order = np.lexsort((-combined, rows))
+        rows, cols, combined = rows[order], cols[order], combined[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < k
+        
+        ids = np.full((len(query_indices), k), -1, dtype=np.int64)
+        scores = np.zeros((len(query_indices), k), dtype=np.float32)
+        ids[rows[keep], rank[keep]] = cols[keep]
+        scores[rows[keep], rank[keep]] = combined[keep]
+        return ids, scores
+    
     def find_similar_hybrid(self, query_idx, k=5, semantic_weight=0.7, return_scores=False):
         """Hybrid approach combining semantic and TF-IDF (BEST overall)"""
-        # Get semantic similarities
-        semantic_results = self.find_similar_semantic(query_idx, k=k*2, return_scores=True)
-        tfidf_results = self.find_similar_tfidf(query_idx, k=k*2, return_scores=True)
-        
-        # Combine scores
-        combined_scores = defaultdict(float)
-        
-        for idx, score in semantic_results:
-            combined_scores[idx] += semantic_weight * score
-            
-        for idx, score in tfidf_results:
-            combined_scores[idx] += (1 - semantic_weight) * score
-        
-        # Sort by combined score
-        sorted_results = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+        ids, scores = self.find_similar_hybrid_batch([query_idx], k=k, semantic_weight=semantic_weight)
         
+        results = [(idx, score) for idx, score in zip(ids[0], scores[0]) if idx >= 0]
         if return_scores:
-            return sorted_results[:k]
+            return results
         else:
-            return [idx for idx, _ in sorted_results[:k]]
+            return [idx for idx, _ in results]
     
     def find_similar_graph(self, query_idx, k=5):
         """Find similar articles using graph-based methods"""
-        if not self.graph.has_node(query_idx):
+        if self.graph is None or not 0 <= query_idx < self.graph.n_nodes:
             return []
         
-        # Get neighbors sorted by edge weight
-        neighbors = list(self.graph.neighbors(query_idx))
-        neighbor_weights = [(n, self.graph[query_idx][n]['weight']) for n in neighbors]
-        neighbor_weights.sort(key=lambda x: x[1], reverse=True)
-        
-        return [idx for idx, _ in neighbor_weights[:k]]
+        # Neighbours come sorted by edge weight
+        neighbour_ids, _ = self.graph.neighbors(query_idx)
+        return neighbour_ids[:k].tolist()
     
     # ===== ADVANCED ANALYSIS METHODS =====
     
-    def detect_article_clusters(self, method='semantic', n_clusters=None):
-        """Detect clusters of related articles"""
-        from sklearn.cluster import KMeans, DBSCAN
-        
+    def detect_article_clusters(self, method='semantic', n_clusters=None, eps=0.5, min_samples=2,
+                                k=DBSCAN_NEIGHBORS, svd_components=SVD_COMPONENTS):
+        """Detect clusters of related articles
+        
+        Semantic features are the stored embeddings; TF-IDF features are reduced
+        with TruncatedSVD instead of being densified. With n_clusters the labels
+        come from MiniBatchKMeans, otherwise from a DBSCAN driven by FAISS k-NN
+        search (eps is the Euclidean radius on unit vectors, as before; SVD
+        features sit closer together than raw TF-IDF rows, so a smaller eps
+        suits method='tfidf').
+        """
         if method == 'semantic':
-            features = self.embeddings.cpu().numpy()
+            features, index = self.embeddings, self.faiss_index
         elif method == 'tfidf':
-            features = self.tfidf_matrix.toarray()
+            features, index = reduce_tfidf(self.tfidf_matrix, svd_components), None
+        else:
+            raise ValueError(f"Unknown clustering method {method}")
         
         if n_clusters:
-            clusterer = KMeans(n_clusters=n_clusters, random_state=42)
+            cluster_labels = minibatch_kmeans(features, n_clusters)
         else:
-            clusterer = DBSCAN(eps=0.5, min_samples=2)
-        
-        cluster_labels = clusterer.fit_predict(features)
+            cluster_labels = knn_dbscan(features, eps=eps, min_samples=min_samples, k=k, index=index)
         
         # Group articles by cluster
         clusters = defaultdict(list)
-        for i, label in enumerate(cluster_labels):
+        for i, label in enumerate(cluster_labels.tolist()):
             clusters[label].append(i)
         
         return dict(clusters)
     
-    def find_trending_topics(self, time_window_hours=24):
-        """Find trending topics (if articles have timestamps)"""
-        # This would require timestamp information in articles
-        # Implementation would filter recent articles and cluster them
-        pass
+    def _update_trending(self, start=0):
+        """Feed the articles from position start onward to the rolling trend clusterer"""
+        if self.trending is None:
+            self.trending = TrendingClusterer(self.embeddings.shape[1], window_hours=self.trend_window_hours)
+        dates = self.articles.column('published_date')[start:]
+        timestamps = np.fromiter((to_timestamp(value, np.nan) for value in dates), dtype=np.float64, count=len(dates))
+        # Articles without a parseable date cannot be placed in the window and are left out
+        dated = np.flatnonzero(~np.isnan(timestamps))
+        if len(dated) < len(timestamps):
+            print(f"{len(timestamps) - len(dated)} articles without a parseable published_date left out of trending")
+        self.trending.add(self.embeddings[start + dated], timestamps[dated], start + dated)
+    
+    def find_trending_topics(self, time_window_hours=24, top_k=10, min_size=2):
+        """Stories ranked by activity over the last time_window_hours, within the rolling trend window
+        
+        Each topic lists its article indices, sizes, first/last publication time
+        and velocity (change in articles per hour against the previous window).
+        """
+        if self.trending is None:
+            return []
+        titles = self.articles.column('title')
+        topics = self.trending.trends(velocity_hours=time_window_hours, min_size=min_size, top_k=top_k)
+        for topic in topics:
+            topic['article_indices'] = [int(i) for i in topic.pop('keys')]
+            # The most recently added headline labels the story
+            topic['title'] = titles[topic['article_indices'][-1]]
+        return topics
     
     def get_article_importance_scores(self):
         """Calculate importance scores using PageRank on article graph"""
         if self.graph is None:
             return {}
         
-        pagerank_scores = nx.pagerank(self.graph, weight='weight')
-        return pagerank_scores
-    
-    def save_index(self, filepath):
-        """Save the entire index to disk"""
-        index_data = {
-            'articles': self.articles,
-            'embeddings': self.embeddings.cpu().numpy() if self.embeddings is not None else None,
-            'tfidf_vectorizer': self.tfidf_vectorizer,
-            'tfidf_matrix': self.tfidf_matrix,
-            'graph': self.graph
+        pagerank_scores = self.graph.pagerank()
+        return dict(enumerate(pagerank_scores.tolist()))
+    
+    def find_story_chains(self, min_size=2):
+        """Groups of articles connected through similarity edges, largest first"""
+        if self.graph is None:
+            return []
+        return [component.tolist() for component in self.graph.components(min_size)]
+    
+    # ===== INDEX BUNDLE =====
+    
+    def save_index(self, dirpath):
+        """Save the index as a versioned directory bundle
+        
+        Arrays are stored as raw .npy files so load_index can memory-map them;
+        the TF-IDF matrix and the graph adjacency are split into their CSR
+        arrays. meta.json is written last and marks the bundle as complete.
+        """
+        os.makedirs(dirpath, exist_ok=True)
+        meta_path = os.path.join(dirpath, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        
+        def save(name, array):
+            # Replace files by rename so a process that still has the old bundle
+            # memory-mapped keeps reading the old data instead of a truncated file
+            tmp_path = os.path.join(dirpath, f"{name}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(dirpath, name))
+        
+        with open(os.path.join(dirpath, 'articles.json'), 'w') as f:
+            json.dump(self.articles.to_columns(), f, default=str)
+        save('embeddings.npy', np.asarray(self.embeddings, dtype=np.float32))
+        
+        # TF-IDF: CSR arrays plus the fitted vocabulary and IDF weights
+        tfidf_matrix = self.tfidf_matrix.tocsr()
+        save('tfidf_data.npy', tfidf_matrix.data)
+        save('tfidf_indices.npy', tfidf_matrix.indices)
+        save('tfidf_indptr.npy', tfidf_matrix.indptr)
+        save('tfidf_idf.npy', self.tfidf_vectorizer.idf_)
+        with open(os.path.join(dirpath, 'tfidf_vocabulary.json'), 'w') as f:
+            json.dump({term: int(column) for term, column in self.tfidf_vectorizer.vocabulary_.items()}, f)
+        
+        # Graph: the CSR arrays of the adjacency; nodes are the article positions
+        adjacency = self.graph.adjacency
+        save('graph_data.npy', adjacency.data)
+        save('graph_indices.npy', adjacency.indices)
+        save('graph_indptr.npy', adjacency.indptr)
+        
+        faiss.write_index(self.faiss_index, os.path.join(dirpath, 'index.faiss'))
+        
+        meta = {
+            'schema_version': INDEX_SCHEMA_VERSION,
+            'embedding_model': self.embedding_model_id,
+            'n_articles': len(self.articles),
+            'embedding_dim': int(self.embeddings.shape[1]),
+            'index_spec': self.index_spec,
+            'index_trained_size': self._index_trained_size,
+            'tfidf_shape': list(tfidf_matrix.shape),
+            'tfidf_fit_size': self._tfidf_fit_size,
         }
-        
-        with open(filepath, 'wb') as f:
-            pickle.dump(index_data, f)
-        
-        # Save FAISS index separately
-        if self.faiss_index is not None:
-            faiss.write_index(self.faiss_index, f"{filepath}.faiss")
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
     
-    def load_index(self, filepath):
-        """Load index from disk"""
-        with open(filepath, 'rb') as f:
-            index_data = pickle.load(f)
+    def load_index(self, dirpath, mmap=True):
+        """Load an index bundle written by save_index, memory-mapping the arrays by default"""
+        meta_path = os.path.join(dirpath, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No complete index bundle at {dirpath}")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('schema_version') != INDEX_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported index schema version {meta.get('schema_version')}, expected {INDEX_SCHEMA_VERSION}")
+        if meta['embedding_model'] != self.embedding_model_id:
+            raise ValueError(f"Index was built with {meta['embedding_model']}, not {self.embedding_model_id}")
+        
+        def load(name):
+            return np.load(os.path.join(dirpath, name), mmap_mode='r' if mmap else None)
+        
+        with open(os.path.join(dirpath, 'articles.json')) as f:
+            self.articles = ArticleBatch(json.load(f))
+        self.embeddings = load('embeddings.npy')
+        
+        self.tfidf_matrix = sp.csr_matrix(
+            (load('tfidf_data.npy'), load('tfidf_indices.npy'), load('tfidf_indptr.npy')),
+            shape=tuple(meta['tfidf_shape'])
+        )
+        self._tfidf_matrix_t = None
+        self.tfidf_vectorizer = TfidfVectorizer(**self.TFIDF_PARAMS)
+        with open(os.path.join(dirpath, 'tfidf_vocabulary.json')) as f:
+            self.tfidf_vectorizer.vocabulary_ = json.load(f)
+        self.tfidf_vectorizer.idf_ = np.load(os.path.join(dirpath, 'tfidf_idf.npy'))
+        self._tfidf_fit_size = meta['tfidf_fit_size']
         
-        self.articles = index_data['articles']
-        self.embeddings = index_data['embeddings']
-        self.tfidf_vectorizer = index_data['tfidf_vectorizer']
-        self.tfidf_matrix = index_data['tfidf_matrix']
-        self.graph = index_data['graph']
+        self.graph = ArticleGraph.from_arrays(load('graph_data.npy'), load('graph_indices.npy'), load('graph_indptr.npy'))
         
-        # Load FAISS index
+        self.index_spec = meta['index_spec']
+        self._index_trained_size = meta['index_trained_size']
         try:
-            self.faiss_index = faiss.read_index(f"{filepath}.faiss")
-        except:
+            self.faiss_index = faiss.read_index(os.path.join(dirpath, 'index.faiss'))
+            set_search_params(self.faiss_index, nprobe=self.nprobe, ef_search=self.ef_search)
+        except RuntimeError:
             print("Could not load FAISS index, rebuilding...")
             self._build_faiss_index()
+        
+        # Trend clusters are cheap to rebuild: only articles inside the window are clustered
+        self.trending = None
+        self._update_trending()
+
+# ===== PERSISTENCE =====
+
+def save_linked_ids(conn, links, page_size=1000):
+    """Write {article_id: [linked article_ids]} back to the articles table in one transaction"""
+    if not links:
+        return 0
+    cursor = conn.cursor()
+    try:
+        # The staging table copies the column types of articles, so values are
+        # coerced exactly as a direct UPDATE of those columns would be
+        cursor.execute("""
+            CREATE TEMP TABLE linked_id_updates ON COMMIT DROP AS
+            SELECT article_id, linked_id FROM articles WITH NO DATA""")
+        execute_values(
+            cursor,
+            "INSERT INTO linked_id_updates (article_id, linked_id) VALUES %s",
+            list(links.items()),
+            page_size=page_size
+        )
+        # Only rewrite rows whose links actually changed
+        cursor.execute("""
+            UPDATE articles AS a SET linked_id = u.linked_id
+            FROM linked_id_updates AS u
+            WHERE a.article_id = u.article_id
+              AND a.linked_id IS DISTINCT FROM u.linked_id""")
+        updated = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    print(f"Updated linked_id for {updated} of {len(links)} articles")
+    return updated
+
+# Only the columns preprocess_text needs; body text never leaves the database
+ARTICLE_QUERY = f"""
+    SELECT {', '.join(ARTICLE_COLUMNS)}
+    FROM articles
+    WHERE duplicate_of IS NULL  -- syndicated copies are indexed once, through their canonical article
+    ORDER BY article_id ASC"""
+
+ARTICLE_BY_ID_QUERY = f"""
+    SELECT {', '.join(ARTICLE_COLUMNS)}
+    FROM articles
+    WHERE duplicate_of IS NULL AND article_id IN %s
+    ORDER BY article_id ASC"""
+
+ARTICLE_ID_QUERY = "SELECT article_id FROM articles WHERE duplicate_of IS NULL"
+
+def fetch_unseen_article_ids(conn, known_ids, batch_size=10000):
+    """article_ids of canonical articles not in known_ids; reads only the id column"""
+    cursor = conn.cursor(name='clustering_article_ids')
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(ARTICLE_ID_QUERY)
+        return [row[0] for row in cursor if row[0] not in known_ids]
+    finally:
+        cursor.close()
+
+def mark_clustering_started(conn):
+    """Record the start of a run before reading articles (see migrations/005_clustering_trigger.sql)
+
+    Uploads committed before this point are read by this run; later ones
+    request a new run.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("UPDATE clustering_trigger SET started_at = now()")
+    conn.commit()
+
+def iter_article_batches(conn, batch_size=1000):
+    """Stream ArticleBatches from a named (server-side) cursor"""
+    cursor = conn.cursor(name='clustering_articles')
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(ARTICLE_QUERY)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield ArticleBatch.from_rows(rows, ARTICLE_COLUMNS)
+    finally:
+        cursor.close()
+
+def iter_article_batches_by_id(conn, article_ids, batch_size=1000):
+    """Yield ArticleBatches of the given article_ids, batch_size ids per query"""
+    article_ids = list(article_ids)
+    with conn.cursor() as cursor:
+        for start in range(0, len(article_ids), batch_size):
+            cursor.execute(ARTICLE_BY_ID_QUERY, (tuple(article_ids[start:start + batch_size]),))
+            rows = cursor.fetchall()
+            if rows:
+                yield ArticleBatch.from_rows(rows, ARTICLE_COLUMNS)
+
+def prefetch(iterable, depth=2):
+    """Iterate in a background thread so the next batch is fetched while the current one is encoded"""
+    items = queue.Queue(maxsize=depth)
+    done = object()
+    
+    def produce():
+        try:
+            for item in iterable:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+    
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = items.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def load_articles(conn, batch_size=1000):
+    """Load the whole articles table as one ArticleBatch"""
+    return ArticleBatch.concat(iter_article_batches(conn, batch_size))
+
+def link_articles(indexer, k=3, positions=None):
+    """Return {article_id: [linked article_ids]} in one batched search
+
+    Covers every indexed article, or only the given positions.
+    """
+    article_ids = indexer.articles.column('article_id')
+    if positions is None:
+        positions = np.arange(len(article_ids))
+    semantic_ids, _ = indexer.find_similar_semantic_batch(positions, k=k)
+    return {
+        article_ids[position]: article_ids[row[row >= 0]].tolist()
+        for position, row in zip(positions, semantic_ids)
+    }
+
+def affected_positions(indexer, new_positions, k=3):
+    """New articles plus their nearest neighbours, whose links the new articles may displace"""
+    if not len(new_positions):
+        return new_positions
+    semantic_ids, _ = indexer.find_similar_semantic_batch(new_positions, k=k)
+    neighbours = semantic_ids[semantic_ids >= 0]
+    return np.union1d(new_positions, neighbours)
+
+# ===== LAMBDA ENTRY POINT =====
+
+# Process-wide indexer, kept in memory across warm invocations
+_INDEXER = None
+
+def get_indexer():
+    """Return the shared indexer, creating it (and loading a saved bundle if configured) on first use"""
+    global _INDEXER
+    if _INDEXER is None:
+        cache_dir = os.environ.get('EMBEDDING_CACHE_DIR', '/tmp/embedding_cache')
+        indexer = NewsArticleIndexer(embedding_cache_dir=cache_dir)
+        bundle_dir = os.environ.get('INDEX_BUNDLE_DIR')
+        if bundle_dir and os.path.exists(os.path.join(bundle_dir, 'meta.json')):
+            print(f"Loading index bundle from {bundle_dir}")
+            try:
+                indexer.load_index(bundle_dir)
+            except (ValueError, FileNotFoundError) as e:
+                # Outdated schema or a different embedding model: rebuild from the
+                # table; the run then overwrites the bundle
+                print(f"Ignoring index bundle, rebuilding: {e}")
+                indexer = NewsArticleIndexer(embedding_cache_dir=cache_dir)
+        _INDEXER = indexer
+    return _INDEXER
+
+def lambda_handler(event, context):
+    """Bring the shared index up to date with the articles table and write back linked_id
+    
+    Warm invocations only encode articles the in-memory index has not seen yet.
+    When the event carries article_ids (sent by raw_data_handler) and the index
+    is already populated, the run is incremental: the id column is compared
+    with the index, so articles whose events reached another container or a
+    failed invocation are picked up too, only unseen rows are read, and only
+    the new articles and their neighbours are relinked. Otherwise the whole
+    table is scanned and every article relinked.
+    """
+    start = time.perf_counter()
+    cold_start = _INDEXER is None
+    indexer = get_indexer()
+    timings = {'cold_start': cold_start, 'init_seconds': time.perf_counter() - start}
+    
+    event_ids = (event or {}).get('article_ids')
+    incremental = bool(event_ids) and len(indexer.articles) > 0
+    timings['incremental'] = incremental
+    
+    with pg_connection() as conn:
+        mark_clustering_started(conn)
+        step = time.perf_counter()
+        known_ids = set(indexer.articles.column('article_id'))
+        before = len(indexer.articles)
+        if incremental:
+            unseen_ids = fetch_unseen_article_ids(conn, known_ids)
+            timings['unseen_outside_event'] = len(set(unseen_ids) - set(event_ids))
+            batches = iter_article_batches_by_id(conn, unseen_ids)
+        else:
+            batches = iter_article_batches(conn)
+        new_batches = (
+            batch[np.fromiter((article_id not in known_ids for article_id in batch.column('article_id')), dtype=bool, count=len(batch))]
+            for batch in batches
+        )
+        indexer.add_article_batches(prefetch(new_batches))
+        new_articles = len(indexer.articles) - before
+        timings['new_articles'] = new_articles
+        timings['index_seconds'] = time.perf_counter() - step
+        timings['trending_topics'] = len(indexer.find_trending_topics())
+        # End the read transaction so the linked_id writes run in their own short
+        # one, committed right after their updated_at stamps (migration 006)
+        conn.commit()
+        
+        step = time.perf_counter()
+        positions = affected_positions(indexer, np.arange(before, len(indexer.articles))) if incremental else None
+        timings['updated_links'] = save_linked_ids(conn, link_articles(indexer, positions=positions))
+        timings['link_seconds'] = time.perf_counter() - step
+    
+    bundle_dir = os.environ.get('INDEX_BUNDLE_DIR')
+    if bundle_dir and new_articles:
+        indexer.save_index(bundle_dir)
+    
+    timings['total_seconds'] = time.perf_counter() - start
+    print(f"Clustering run ({'cold' if cold_start else 'warm'} start): {json.dumps(timings)}")
+    return {
+        "statusCode": 200,
+        "body": json.dumps(timings)
+    }
 
 # ===== USAGE EXAMPLE =====
 
@@ -264,34 +802,27 @@ def main():
     # Sample articles
     conn = get_postgresql_connection()
     cursor = conn.cursor()
-    query = "SELECT * FROM articles order by article_id asc"
-    cursor.execute(query)
-    articles_db = cursor.fetchall()
-    articles = [{} for _ in range(len(articles_db))]
-    for i, article in enumerate(articles_db):
-        articles[i] = {
-            "article_id": article[0],
-            "title": article[1],
-            # "content": article[2],
-            "location_mention": article[5],
-            "officals_involved": article[6],
-            "relevance_category": article[7],
-        }
+    articles = load_articles(conn)
     
     # Initialize indexer
-    indexer = NewsArticleIndexer()
+    indexer = NewsArticleIndexer(embedding_cache_dir=os.environ.get('EMBEDDING_CACHE_DIR', '/tmp/embedding_cache'))
     indexer.add_articles(articles)
     
     # Test different similarity methods
      # "President Signs New Trade Deal"
+    # One batched FAISS search covers every article
+    semantic_ids, _ = indexer.find_similar_semantic_batch(np.arange(len(articles)), k=3)
+    hybrid_ids, _ = indexer.find_similar_hybrid_batch(np.arange(len(articles)), k=3)
+    links = {}
     for i, article in enumerate(articles):
         query_idx = i
         print(f"\n🔍 i: '{i}'")
         print(f"\n🔍 Finding articles similar to: '{articles[query_idx]['title']}'")
         linked_id = []
         print("\n1.  Semantic Similarity (Best for meaning):")
-        semantic_results = indexer.find_similar_semantic(query_idx, k=3)
-        for idx in semantic_results:
+        for idx in semantic_ids[query_idx]:
+            if idx < 0:
+                break
             linked_id.append(articles[idx]['article_id'])
             print(f"   - {articles[idx]['title']}")
         
@@ -301,11 +832,11 @@ def main():
         #     print(f"   - {articles[idx]['title']}")
         
         print("\n3. Hybrid Similarity (Best overall):")
-        hybrid_results = indexer.find_similar_hybrid(query_idx, k=3)
-        for idx in hybrid_results:
+        for idx in hybrid_ids[query_idx]:
+            if idx < 0:
+                break
             print(f"   - {articles[idx]['title']}")
-        cursor.execute("UPDATE articles SET linked_id = %s WHERE article_id = %s", (linked_id, articles[query_idx]['article_id']))
-        conn.commit()
+        links[articles[query_idx]['article_id']] = linked_id
         # print("\n4. Graph-based Similarity:")
         # graph_results = indexer.find_similar_graph(query_idx, k=3)
         # for idx in graph_results:
@@ -326,6 +857,10 @@ def main():
         # sorted_importance = sorted(importance_scores.items(), key=lambda x: x[1], reverse=True)
         # for idx, score in sorted_importance[:3]:
         #     print(f"   {score:.3f} - {articles[idx]['title']}")
+    
+    save_linked_ids(conn, links)
+    cursor.close()
+    conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding cache keyed by article_id and preprocessed text hash.
+
+    Vectors live in an append-only float32 file that is memory-mapped on read,
+    and a JSON sidecar maps each article_id to its row and text hash.
+    """
+
+    VECTORS_FILE = 'embeddings.f32'
+    SIDECAR_FILE = 'index.json'
+    COMPACT_RATIO = 2  # rewrite the vector file once stale rows outnumber live ones
+
+    def __init__(self, directory, model_name):
+        self.directory = directory
+        self.model_name = model_name
+        self.dim = None
+        self.rows = {}  # article_id -> [row, text_hash]
+        self.n_rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.directory, self.VECTORS_FILE)
+
+    @property
+    def sidecar_path(self):
+        return os.path.join(self.directory, self.SIDECAR_FILE)
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        """Read the sidecar, discarding the cache if it was built by another model"""
+        if not os.path.exists(self.sidecar_path):
+            return
+        with open(self.sidecar_path) as f:
+            meta = json.load(f)
+        if meta.get('model') != self.model_name:
+            print(f"Embedding cache was built with {meta.get('model')}, starting a new one")
+            return
+        self.dim = meta['dim']
+        self.rows = meta['rows']
+        # Rows appended after the last sidecar write are simply unreferenced
+        self.n_rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _vectors(self):
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.n_rows, self.dim))
+
+    def _save_sidecar(self):
+        tmp_path = f"{self.sidecar_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'rows': self.rows}, f)
+        os.replace(tmp_path, self.sidecar_path)
+
+    def _append(self, keys, hashes, vectors):
+        if self.dim is None or self.n_rows == 0:
+            # Fresh cache: truncate anything left over from a different model
+            self.dim = vectors.shape[1]
+            open(self.vectors_path, 'wb').close()
+            self.n_rows = 0
+        with open(self.vectors_path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        for offset, (key, text_hash) in enumerate(zip(keys, hashes)):
+            self.rows[key] = [self.n_rows + offset, text_hash]
+        self.n_rows += len(vectors)
+        if self.n_rows > self.COMPACT_RATIO * len(self.rows):
+            self._compact()
+        self._save_sidecar()
+
+    def _compact(self):
+        """Drop rows that no article_id points at any more"""
+        keys = list(self.rows)
+        live = self._vectors()[[self.rows[key][0] for key in keys]]
+        tmp_path = f"{self.vectors_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(live).tobytes())
+        os.replace(tmp_path, self.vectors_path)
+        for row, key in enumerate(keys):
+            self.rows[key][0] = row
+        self.n_rows = len(keys)
+
+    def get_or_encode(self, keys, texts, encode_fn):
+        """Return embeddings for texts, encoding only missing or changed entries"""
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        hashes = [self.text_hash(text) for text in texts]
+        # Articles without an id are cached under their text hash
+        keys = [str(key) if key is not None else text_hash for key, text_hash in zip(keys, hashes)]
+
+        hit_positions, hit_rows, missing = [], [], []
+        for pos, (key, text_hash) in enumerate(zip(keys, hashes)):
+            entry = self.rows.get(key)
+            if entry is not None and entry[1] == text_hash:
+                hit_positions.append(pos)
+                hit_rows.append(entry[0])
+            else:
+                missing.append(pos)
+        print(f"Embedding cache: {len(hit_positions)} hits, {len(missing)} to encode")
+
+        new_vectors = None
+        if missing:
+            new_vectors = np.asarray(encode_fn([texts[pos] for pos in missing]), dtype=np.float32)
+            if self.dim is not None and new_vectors.shape[1] != self.dim:
+                # Dimension changed under the same model name; start over
+                self.rows, self.n_rows, self.dim = {}, 0, None
+                hit_positions, hit_rows = [], []
+                missing = list(range(len(texts)))
+                new_vectors = np.asarray(encode_fn(texts), dtype=np.float32)
+
+        dim = self.dim if new_vectors is None else new_vectors.shape[1]
+        result = np.empty((len(texts), dim), dtype=np.float32)
+        if hit_positions:
+            result[hit_positions] = self._vectors()[hit_rows]
+        if missing:
+            result[missing] = new_vectors
+            self._append([keys[pos] for pos in missing], [hashes[pos] for pos in missing], new_vectors)
+        return result
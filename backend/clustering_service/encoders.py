@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+import numpy as np
+
+# torch: the float32 PyTorch model. torch-int8: its Linear layers dynamically
+# quantised to int8. onnx / onnx-int8: ONNX Runtime with the exported and the
+# quantised ONNX graphs published with the model.
+ENCODER_BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+DEFAULT_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'torch')
+DEFAULT_THREADS = int(os.environ.get('EMBEDDING_THREADS', '0')) or os.cpu_count() or 1
+# ONNX files shipped in the model repository; quint8_avx2 runs on every x86 Lambda
+ONNX_FILE = os.environ.get('EMBEDDING_ONNX_FILE', 'onnx/model.onnx')
+ONNX_INT8_FILE = os.environ.get('EMBEDDING_ONNX_INT8_FILE', 'onnx/model_quint8_avx2.onnx')
+
+# Dynamic batching: a batch holds about this many tokens, so short titles go
+# through in large batches and long texts in small ones
+TOKEN_BUDGET = int(os.environ.get('EMBEDDING_TOKEN_BUDGET', '8192'))
+CHARS_PER_TOKEN = 4
+MAX_BATCH_SIZE = 256
+
+
+def model_id(name, backend):
+    """Identifier of the vectors a (model, backend) pair produces
+
+    Quantised backends drift slightly from the float32 model, so their
+    embeddings are cached and bundled under their own identifier.
+    """
+    return name if backend == 'torch' else f"{name}@{backend}"
+
+
+def length_sorted_batches(lengths, max_tokens, token_budget=TOKEN_BUDGET, max_batch_size=MAX_BATCH_SIZE):
+    """Split positions into batches of similar length, longest first, each within the token budget"""
+    tokens = np.minimum(np.asarray(lengths) // CHARS_PER_TOKEN + 2, max_tokens)
+    order = np.argsort(-tokens, kind='stable')
+    batches, start = [], 0
+    while start < len(order):
+        # Sorted descending, so the first text of a batch is its longest
+        size = int(min(max_batch_size, max(1, token_budget // max(int(tokens[order[start]]), 1))))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+class Encoder:
+    """
+    Sentence embedding model behind one of ENCODER_BACKENDS.
+
+    encode() returns a single C-contiguous float32 (n, dim) array in input
+    order; texts are encoded in length-sorted, token-budgeted batches.
+    """
+
+    def __init__(self, name='all-MiniLM-L6-v2', backend=DEFAULT_BACKEND, use_gpu=False, threads=DEFAULT_THREADS):
+        if backend not in ENCODER_BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend}, expected one of {ENCODER_BACKENDS}")
+        self.name = name
+        self.backend = backend
+        self.threads = threads
+        self.model = self._load(name, backend, use_gpu, threads)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.max_tokens = getattr(self.model, 'max_seq_length', None) or 256
+
+    @staticmethod
+    def _load(name, backend, use_gpu, threads):
+        from sentence_transformers import SentenceTransformer
+        if backend.startswith('onnx'):
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = threads
+            file_name = ONNX_INT8_FILE if backend == 'onnx-int8' else ONNX_FILE
+            return SentenceTransformer(name, backend='onnx', model_kwargs={
+                'file_name': file_name,
+                'provider': 'CPUExecutionProvider',
+                'session_options': session_options,
+            })
+
+        import torch
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(name, device='cuda' if use_gpu else 'cpu')
+        if backend == 'torch-int8':
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+        return model
+
+    def encode(self, texts):
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        for batch in length_sorted_batches([len(text) for text in texts], self.max_tokens):
+            embeddings[batch] = self.model.encode(
+                [texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True, show_progress_bar=False
+            )
+        return embeddings
+
+
+# Loaded encoders are kept for the lifetime of the process so warm Lambda
+# invocations and multiple indexers share one copy
+_ENCODERS = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(name='all-MiniLM-L6-v2', backend=DEFAULT_BACKEND, use_gpu=False, threads=DEFAULT_THREADS):
+    """Return a cached Encoder, importing and loading the model on first use"""
+    key = (name, backend, use_gpu, threads)
+    with _encoders_lock:
+        if key not in _ENCODERS:
+            start = time.perf_counter()
+            _ENCODERS[key] = Encoder(name, backend, use_gpu, threads)
+            print(f"Loaded embedding model {name} ({backend}, {threads} threads) in {time.perf_counter() - start:.2f}s")
+    return _ENCODERS[key]
@@ -0,0 +1,135 @@
+import math
+import re
+import time
+import numpy as np
+import faiss
+
+# Scaling ladder: exact search, then graph search, then inverted lists with
+# progressively stronger compression as the corpus outgrows the memory budget
+FLAT_MAX_VECTORS = 10000
+HNSW_MAX_VECTORS = 1000000
+HNSW_M = 32
+DEFAULT_MEMORY_BUDGET_MB = 1024
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+MAX_TRAINING_VECTORS = 100000
+
+
+def normalize_embeddings(embeddings):
+    """Return a contiguous float32 copy with unit-length rows, so inner product equals cosine"""
+    embeddings = np.array(embeddings, dtype=np.float32, order='C', copy=True)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def ivf_nlist(n):
+    """Number of inverted lists: ~4*sqrt(n), keeping at least 39 training points per list"""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def pq_subquantizers(d):
+    """Largest divisor of d that gives at least 8 dimensions per PQ sub-vector"""
+    for m in range(max(1, d // 8), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def choose_index_spec(n, d, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """Pick a faiss.index_factory string for n vectors of dimension d within a memory budget"""
+    budget = memory_budget_mb * 2 ** 20
+    flat_bytes = n * d * 4
+    if n < FLAT_MAX_VECTORS:
+        return "Flat"
+    # HNSW keeps the full vectors plus ~2*M neighbour links per vector on the base layer
+    if n < HNSW_MAX_VECTORS and flat_bytes + n * HNSW_M * 2 * 4 <= budget:
+        return f"HNSW{HNSW_M}"
+    nlist = ivf_nlist(n)
+    if flat_bytes <= budget:
+        return f"IVF{nlist},Flat"
+    if n * d <= budget:
+        return f"IVF{nlist},SQ8"
+    return f"IVF{nlist},PQ{pq_subquantizers(d)}"
+
+
+def index_family(spec):
+    """Strip the size parameters from a spec, e.g. 'IVF1024,PQ48' -> 'IVF,PQ'"""
+    return re.sub(r'\d+', '', spec)
+
+
+def build_index(embeddings, spec):
+    """Build and fill an inner-product index for unit-normalised embeddings"""
+    index = faiss.index_factory(embeddings.shape[1], spec, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        training = embeddings
+        if len(training) > MAX_TRAINING_VECTORS:
+            rng = np.random.default_rng(42)
+            training = embeddings[np.sort(rng.choice(len(embeddings), MAX_TRAINING_VECTORS, replace=False))]
+        index.train(training)
+    index.add(embeddings)
+    return index
+
+
+def set_search_params(index, nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH):
+    """Apply nprobe (IVF) and efSearch (HNSW) where the index supports them"""
+    params = faiss.ParameterSpace()
+    for name, value in (('nprobe', nprobe), ('efSearch', ef_search)):
+        if value is None:
+            continue
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # parameter does not apply to this index type
+
+
+def recall_report(embeddings, specs=None, k=10, n_queries=1000, nprobe_values=(1, 4, 16, 64), ef_search_values=(16, 64, 256)):
+    """Measure recall@k and per-query latency of candidate indices against exact search
+
+    Returns a list of dicts, one per (spec, search parameter) combination.
+    """
+    embeddings = normalize_embeddings(embeddings)
+    n, d = embeddings.shape
+    if specs is None:
+        nlist = ivf_nlist(n)
+        specs = ["Flat", f"HNSW{HNSW_M}", f"IVF{nlist},Flat", f"IVF{nlist},SQ8", f"IVF{nlist},PQ{pq_subquantizers(d)}"]
+
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(n, min(n_queries, n), replace=False)]
+    exact = faiss.IndexFlatIP(d)
+    exact.add(embeddings)
+    _, truth = exact.search(queries, k)
+
+    report = []
+    for spec in specs:
+        start = time.perf_counter()
+        index = build_index(embeddings, spec)
+        build_seconds = time.perf_counter() - start
+
+        if spec.startswith('IVF'):
+            settings = [{'nprobe': value} for value in nprobe_values]
+        elif spec.startswith('HNSW'):
+            settings = [{'ef_search': value} for value in ef_search_values]
+        else:
+            settings = [{}]
+
+        for setting in settings:
+            set_search_params(index, nprobe=setting.get('nprobe'), ef_search=setting.get('ef_search'))
+            start = time.perf_counter()
+            _, found = index.search(queries, k)
+            search_seconds = time.perf_counter() - start
+            hits = sum(len(np.intersect1d(row_found, row_truth)) for row_found, row_truth in zip(found, truth))
+            report.append({
+                'spec': spec,
+                'params': setting,
+                'recall': hits / truth.size,
+                'ms_per_query': 1000 * search_seconds / len(queries),
+                'build_seconds': build_seconds,
+            })
+    return report
+
+
+def print_recall_report(report, k=10):
+    print(f"{'index':<22} {'params':<18} {f'recall@{k}':>10} {'ms/query':>10} {'build s':>9}")
+    for row in report:
+        params = ','.join(f"{key}={value}" for key, value in row['params'].items()) or '-'
+        print(f"{row['spec']:<22} {params:<18} {row['recall']:>10.4f} {row['ms_per_query']:>10.4f} {row['build_seconds']:>9.2f}")
@@ -0,0 +1,162 @@
+import numpy as np
+import faiss
+
+from index_factory import normalize_embeddings
+from Date_helper import parse_published_date
+
+TREND_WINDOW_HOURS = 7 * 24
+# Cosine similarity to a cluster centroid at or above which an article joins the cluster
+TREND_SIMILARITY = 0.6
+VELOCITY_WINDOW_HOURS = 24
+
+
+def to_timestamp(value, default=None):
+    """Epoch seconds of a published_date value (datetime, date or date string); default if unparseable"""
+    parsed = parse_published_date(value)
+    return parsed.timestamp() if parsed else default
+
+
+class TrendCluster:
+    """Running centroid and member history of one story"""
+
+    def __init__(self, dim):
+        self.vector_sum = np.zeros(dim, dtype=np.float32)
+        self.keys = []
+        self.timestamps = []
+
+    def add(self, vector, key, timestamp):
+        self.vector_sum += vector
+        self.keys.append(key)
+        self.timestamps.append(timestamp)
+
+    @property
+    def centroid(self):
+        return normalize_embeddings(self.vector_sum[None, :])[0]
+
+    @property
+    def first_seen(self):
+        return min(self.timestamps)
+
+    @property
+    def last_seen(self):
+        return max(self.timestamps)
+
+    def trim(self, cutoff):
+        """Forget members older than cutoff; the centroid keeps their contribution"""
+        kept = [(key, ts) for key, ts in zip(self.keys, self.timestamps) if ts >= cutoff]
+        self.keys = [key for key, _ in kept]
+        self.timestamps = [ts for _, ts in kept]
+
+
+class TrendingClusterer:
+    """
+    Online clusterer over a rolling time window of articles.
+
+    Each batch is matched against the live cluster centroids with one FAISS
+    search; an article joins its nearest centroid when similar enough and
+    otherwise starts a new cluster (articles earlier in the same batch count).
+    Clusters with no article inside the window are evicted, so the cost of a
+    batch depends on the window's contents, not on the archive size.
+    Time is taken from the articles' published dates, not the wall clock.
+    """
+
+    def __init__(self, dim, window_hours=TREND_WINDOW_HOURS, similarity=TREND_SIMILARITY):
+        self.dim = dim
+        self.window_seconds = window_hours * 3600
+        self.similarity = similarity
+        self.centroids = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.clusters = {}  # cluster id -> TrendCluster
+        self.now = None
+        self._next_id = 0
+
+    def add(self, embeddings, timestamps, keys):
+        """Assign unit-length embeddings to clusters; returns the cluster id per article, -1 if outside the window"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        assigned = np.full(len(embeddings), -1, dtype=np.int64)
+        if not len(embeddings):
+            return assigned
+
+        self.now = max(self.now or -np.inf, timestamps.max())
+        cutoff = self.now - self.window_seconds
+        live = np.flatnonzero(timestamps >= cutoff)
+        live = live[np.argsort(timestamps[live], kind='stable')]
+        if not len(live):
+            return assigned
+
+        # 1. One search of the whole batch against the existing centroids
+        if self.centroids.ntotal:
+            scores, ids = self.centroids.search(embeddings[live], 1)
+            scores, ids = scores[:, 0], ids[:, 0]
+        else:
+            scores, ids = np.full(len(live), -np.inf, dtype=np.float32), np.full(len(live), -1, dtype=np.int64)
+
+        # 2. Articles that match no existing cluster are grouped with each other
+        new_ids, new_vectors = [], np.empty((0, self.dim), dtype=np.float32)
+        touched = set()
+        for row, score, cluster_id in zip(live, scores, ids):
+            vector = embeddings[row]
+            if score < self.similarity and new_ids:
+                new_scores = new_vectors @ vector
+                best = int(np.argmax(new_scores))
+                if new_scores[best] > score:
+                    score, cluster_id = new_scores[best], new_ids[best]
+            if score < self.similarity or cluster_id < 0:
+                cluster_id = self._next_id
+                self._next_id += 1
+                self.clusters[cluster_id] = TrendCluster(self.dim)
+                new_ids.append(cluster_id)
+                new_vectors = np.vstack([new_vectors, vector[None, :]])
+            self.clusters[cluster_id].add(vector, keys[row], timestamps[row])
+            if cluster_id in new_ids:
+                new_vectors[new_ids.index(cluster_id)] = self.clusters[cluster_id].centroid
+            touched.add(int(cluster_id))
+            assigned[row] = cluster_id
+
+        # 3. Write the moved and new centroids back, then drop expired clusters
+        touched = np.fromiter(touched, dtype=np.int64, count=len(touched))
+        self.centroids.remove_ids(touched)
+        self.centroids.add_with_ids(np.stack([self.clusters[i].centroid for i in touched]), touched)
+        self.evict(cutoff)
+        return assigned
+
+    def evict(self, cutoff):
+        """Remove clusters whose newest article is older than cutoff"""
+        expired = [cluster_id for cluster_id, cluster in self.clusters.items() if cluster.last_seen < cutoff]
+        if expired:
+            self.centroids.remove_ids(np.array(expired, dtype=np.int64))
+            for cluster_id in expired:
+                del self.clusters[cluster_id]
+        for cluster in self.clusters.values():
+            cluster.trim(cutoff)
+
+    def trends(self, velocity_hours=VELOCITY_WINDOW_HOURS, min_size=2, top_k=10):
+        """
+        Clusters ranked by recent activity.
+
+        recent is the number of articles in the last velocity_hours, previous
+        the number in the period before that, and velocity their difference per
+        hour: positive while a story is picking up.
+        """
+        if self.now is None:
+            return []
+        span = velocity_hours * 3600
+        topics = []
+        for cluster_id, cluster in self.clusters.items():
+            if len(cluster.keys) < min_size:
+                continue
+            timestamps = np.asarray(cluster.timestamps)
+            recent = int(np.sum(timestamps > self.now - span))
+            previous = int(np.sum((timestamps > self.now - 2 * span) & (timestamps <= self.now - span)))
+            topics.append({
+                'cluster_id': int(cluster_id),
+                'size': len(cluster.keys),
+                'recent': recent,
+                'previous': previous,
+                'velocity': (recent - previous) / velocity_hours,
+                'first_seen': cluster.first_seen,
+                'last_seen': cluster.last_seen,
+                'keys': list(cluster.keys),
+            })
+        topics.sort(key=lambda topic: (topic['recent'], topic['velocity'], topic['size']), reverse=True)
+        return topics[:top_k]
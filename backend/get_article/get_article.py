@@ -0,0 +1,22 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Utils import pg_connection
+from Response_helper import json_response
+
+
+def lambda_handler(event, context):
+    """Full article, body included, by article_id (path parameter or query parameter)"""
+    event = event or {}
+    article_id = ((event.get('pathParameters') or {}).get('article_id')
+                  or (event.get('queryStringParameters') or {}).get('article_id'))
+    if not article_id:
+        return json_response(event, 400, {"error": "article_id is required"})
+
+    with pg_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT * FROM articles WHERE article_id = %s", (article_id,))
+        row = cursor.fetchone()
+        columns = [desc[0] for desc in cursor.description]
+    if row is None:
+        return json_response(event, 404, {"error": f"article {article_id} not found"})
+    return json_response(event, 200, dict(zip(columns, row)))
@@ -1,23 +1,199 @@
 
+import base64
+import datetime
+import hashlib
 import json
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from Utils import get_postgresql_connection
+from Utils import pg_connection
+from Response_helper import etag_matches, iter_json_rows, json_response, not_modified_response
 
+# List view columns: everything the table needs, without the article body
+LIST_COLUMNS = (
+    'article_id', 'title', 'source', 'published_date', 'sentiment', 'relevance_category',
+    'location_mentions', 'officials_involved', 'linked_id', 'duplicate_of',
+)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-def lambda_handler(event, context):
-    conn = get_postgresql_connection()
-    cursor = conn.cursor()
-    query = "SELECT * FROM articles order by article_id asc"
-    cursor.execute(query)
+
+def _iso_date(value):
+    return datetime.date.fromisoformat(value).isoformat()
+
+
+def _contains(value):
+    return f"%{value.strip().lower()}%"
+
+
+# query parameter -> (SQL condition, value transform); see migrations/003_feed_indexes.sql
+FEED_FILTERS = {
+    'date_from': ("published_date >= %s", _iso_date),
+    'date_to': ("published_date <= %s", _iso_date),
+    'location': ("location_mentions ILIKE %s", _contains),
+    'district': ("location_mentions ILIKE %s", _contains),
+    'sentiment': ("sentiment = %s", lambda value: value.strip().upper()),
+    'category': ("relevance_category ILIKE %s", _contains),
+    'source': ("source = %s", lambda value: value.strip()),
+}
+FEED_ORDER = "published_date DESC NULLS LAST, article_id DESC"
+
+# Delta reads stop this far short of now: rows from write transactions still
+# in flight carry an earlier updated_at, and the next poll picks them up
+DELTA_SETTLE_SECONDS = int(os.environ.get('FEED_DELTA_SETTLE_SECONDS', '10'))
+DELTA_PAGE_SIZE = 1000
+NIL_ARTICLE_ID = '00000000-0000-0000-0000-000000000000'
+# Browsers revalidate with If-None-Match on every poll instead of reusing a stale copy
+CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _encode(values):
+    values = [value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor: the (published_date, article_id) of the last row of a page"""
+    return _encode([row['published_date'], str(row['article_id'])])
+
+
+def encode_since(updated_at, article_id=NIL_ARTICLE_ID):
+    """Opaque delta cursor: the (updated_at, article_id) of the last change a client has seen"""
+    return _encode([updated_at, str(article_id)])
+
+
+def decode_cursor(cursor):
+    try:
+        first, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return first, article_id
+    except Exception:
+        raise BadRequest("invalid cursor")
+
+
+def build_feed_query(params):
+    """SQL and arguments for one page of the feed, newest first"""
+    conditions, args = [], []
+    for name, (condition, transform) in FEED_FILTERS.items():
+        value = params.get(name)
+        if value:
+            try:
+                args.append(transform(value))
+            except ValueError:
+                raise BadRequest(f"invalid {name}: {value}")
+            conditions.append(condition)
+
+    if params.get('cursor'):
+        published_date, article_id = decode_cursor(params['cursor'])
+        if published_date is None:
+            # Already inside the trailing undated rows
+            conditions.append("(published_date IS NULL AND article_id < %s)")
+            args.append(article_id)
+        else:
+            conditions.append("((published_date, article_id) < (%s, %s) OR published_date IS NULL)")
+            args.extend([published_date, article_id])
+
+    try:
+        limit = min(max(int(params.get('limit') or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise BadRequest(f"invalid limit: {params.get('limit')}")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # One extra row tells whether another page follows
+    query = f"SELECT {', '.join(LIST_COLUMNS)} FROM articles {where} ORDER BY {FEED_ORDER} LIMIT %s"
+    return query, args + [limit + 1], limit
+
+
+def fetch_feed_page(cursor, params):
+    query, args, limit = build_feed_query(params)
+    cursor.execute(query, args)
+    columns = [desc[0] for desc in cursor.description]
+    items = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
+
+def feed_state(cursor, params):
+    """(ETag, initial since cursor) for the current contents of the articles table
+
+    The ETag is taken from the newest change older than the settle horizon.
+    Writes can commit out of updated_at order (parallel uploads, the
+    clustering run), so the unsettled maximum could stay put while an
+    earlier-stamped change lands, and a change still settling must not turn
+    the next since= poll for it into a 304.
+    """
+    cursor.execute(
+        """SELECT (SELECT max(updated_at) FROM articles WHERE updated_at <= horizon.at),
+                  horizon.at
+           FROM (SELECT now() - make_interval(secs => %s) AS at) AS horizon""",
+        (DELTA_SETTLE_SECONDS,))
+    version, horizon = cursor.fetchone()
+    key = json.dumps([version.isoformat() if version else None, sorted(params.items())])
+    return f'W/"{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"', encode_since(horizon)
+
+
+def fetch_changes(cursor, since):
+    """Articles inserted or updated after the since cursor, oldest change first"""
+    updated_at, article_id = decode_cursor(since)
+    cursor.execute(
+        """SELECT * FROM articles
+           WHERE (updated_at, article_id) > (%s, %s)
+             AND updated_at <= now() - make_interval(secs => %s)
+           ORDER BY updated_at, article_id
+           LIMIT %s""",
+        (updated_at, article_id, DELTA_SETTLE_SECONDS, DELTA_PAGE_SIZE + 1))
     columns = [desc[0] for desc in cursor.description]
-    rows = cursor.fetchall()
-    result = [dict(zip(columns, row)) for row in rows]
-    return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json"
-            },
-            "body": json.dumps(result)
-    }
\ No newline at end of file
+    items = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    has_more = len(items) > DELTA_PAGE_SIZE
+    items = items[:DELTA_PAGE_SIZE]
+    next_since = encode_since(items[-1]['updated_at'], items[-1]['article_id']) if items else since
+    return {"items": items, "next_since": next_since, "has_more": has_more}
+
+
+def lambda_handler(event, context):
+    """
+    Article feed.
+
+    With query parameters (limit, cursor, date_from, date_to, location/district,
+    sentiment, category, source) returns one page of the list projection:
+    {"items": [...], "next_cursor": "..."}; pass next_cursor back to get the
+    next page. Full articles come from the get_article endpoint.
+
+    With since=<cursor> returns the full rows inserted or updated after it
+    (new linked_ids included): {"items": [...], "next_since": "...",
+    "has_more": bool}. Every response carries an X-Feed-Since header to start
+    delta polling from.
+
+    Without query parameters returns every article as a JSON array, the
+    response the current dashboard expects.
+
+    Responses carry an ETag; a matching If-None-Match gets a 304 without
+    running the feed query.
+    """
+    params = (event or {}).get('queryStringParameters') or {}
+    try:
+        with pg_connection() as conn:
+            with conn.cursor() as cursor:
+                etag, since = feed_state(cursor, params)
+            headers = dict(CACHE_HEADERS, **{"ETag": etag, "X-Feed-Since": since})
+            if etag_matches(event, etag):
+                return not_modified_response(etag, headers)
+
+            if not params:
+                # Server-side cursor: rows are streamed into the response body batch by batch
+                with conn.cursor(name='feed_rows') as cursor:
+                    query = "SELECT * FROM articles order by article_id asc"
+                    cursor.execute(query)
+                    return json_response(event, 200, chunks=iter_json_rows(cursor), headers=headers)
+
+            with conn.cursor() as cursor:
+                if params.get('since'):
+                    page = fetch_changes(cursor, params['since'])
+                else:
+                    page = fetch_feed_page(cursor, params)
+    except BadRequest as e:
+        return json_response(event, 400, {"error": str(e)})
+    return json_response(event, 200, page, headers=headers)
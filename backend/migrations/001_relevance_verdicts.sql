@@ -0,0 +1,10 @@
+-- Relevance verdict cache shared by raw_data_handler invocations (Agent_helper.VerdictCache).
+CREATE TABLE IF NOT EXISTS relevance_verdicts (
+    content_hash    text PRIMARY KEY,
+    is_relevant     boolean NOT NULL,
+    relevance_score real,
+    created_at      timestamptz NOT NULL DEFAULT now()
+);
+
+-- Supports TTL pruning: DELETE FROM relevance_verdicts WHERE created_at < now() - interval '30 days';
+CREATE INDEX IF NOT EXISTS relevance_verdicts_created_at_idx ON relevance_verdicts (created_at);
@@ -0,0 +1,5 @@
+-- Near-duplicate copies of a story (same wire report in several newspapers) keep
+-- their own row per source and point at the canonical article they were grouped with.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS duplicate_of text;
+
+CREATE INDEX IF NOT EXISTS articles_duplicate_of_idx ON articles (duplicate_of) WHERE duplicate_of IS NOT NULL;
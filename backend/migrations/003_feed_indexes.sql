@@ -0,0 +1,18 @@
+-- Indexes behind get_feed's keyset pagination and filters.
+
+-- Feed order: newest first, article_id as tie-breaker (matches get_feed.FEED_ORDER)
+CREATE INDEX IF NOT EXISTS articles_feed_order_idx
+    ON articles (published_date DESC NULLS LAST, article_id DESC);
+
+-- Equality filters keep the feed order inside each value
+CREATE INDEX IF NOT EXISTS articles_source_feed_idx
+    ON articles (source, published_date DESC NULLS LAST, article_id DESC);
+CREATE INDEX IF NOT EXISTS articles_sentiment_feed_idx
+    ON articles (sentiment, published_date DESC NULLS LAST, article_id DESC);
+
+-- Substring (ILIKE '%...%') filters on the comma-joined entity and key phrase columns
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS articles_location_mentions_trgm_idx
+    ON articles USING gin (location_mentions gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS articles_relevance_category_trgm_idx
+    ON articles USING gin (relevance_category gin_trgm_ops);
@@ -0,0 +1,22 @@
+-- Change tracking for get_feed's ETags and since= delta sync.
+-- Every write path (raw_data_handler upserts, clustering_service linked_id
+-- updates) is covered by the trigger, so writers need not set updated_at.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS articles_updated_at_idx ON articles (updated_at, article_id);
+
+-- Bump updated_at only when an UPDATE actually changes the row, so idempotent
+-- re-uploads and unchanged upserts do not show up as changes
+CREATE OR REPLACE FUNCTION articles_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    IF ROW(NEW.*) IS DISTINCT FROM ROW(OLD.*) THEN
+        NEW.updated_at := now();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS articles_touch_updated_at ON articles;
+CREATE TRIGGER articles_touch_updated_at
+    BEFORE UPDATE ON articles
+    FOR EACH ROW EXECUTE FUNCTION articles_touch_updated_at();
@@ -0,0 +1,11 @@
+-- Coalesces clustering_service invocations across raw_data_handler events.
+-- A run is pending while requested_at is newer than started_at; uploads that
+-- arrive meanwhile skip the invocation, since the pending run reads every
+-- article not yet in its index when it starts.
+CREATE TABLE IF NOT EXISTS clustering_trigger (
+    id           boolean PRIMARY KEY DEFAULT true CHECK (id),  -- single row
+    requested_at timestamptz,
+    started_at   timestamptz
+);
+
+INSERT INTO clustering_trigger (id) VALUES (true) ON CONFLICT DO NOTHING;
@@ -0,0 +1,14 @@
+-- updated_at records when the row was written, not when its transaction began.
+-- now() is the transaction start time; a long transaction (a clustering run)
+-- would stamp its linked_id updates minutes before they become visible, behind
+-- the FEED_DELTA_SETTLE_SECONDS horizon that since= clients have already passed.
+ALTER TABLE articles ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+
+CREATE OR REPLACE FUNCTION articles_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    IF ROW(NEW.*) IS DISTINCT FROM ROW(OLD.*) THEN
+        NEW.updated_at := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,36 @@
+-- Rewrites published_date values stored as written in the uploaded .docx
+-- (DD/MM/YYYY and similar) to YYYY-MM-DD, the form raw_data_handler now stores
+-- (Date_helper.iso_date). The feed's date filters, its ordering and the
+-- indexes from 003 compare the text, which only orders correctly in ISO form.
+-- Values that match none of the formats, or are not real dates, are left unchanged.
+CREATE FUNCTION pg_temp.iso_published_date(value text) RETURNS text AS $$
+DECLARE
+    text_value text := regexp_replace(trim(value), '\s+', ' ', 'g');
+BEGIN
+    IF text_value ~ '^\d{1,2}[/.-]\d{1,2}[/.-]\d{4}$' THEN
+        RETURN to_char(to_date(regexp_replace(text_value, '[/.-]', '/', 'g'), 'DD/MM/YYYY'), 'YYYY-MM-DD');
+    ELSIF text_value ~* '^\d{1,2} [a-z]+ \d{4}$' THEN
+        RETURN to_char(to_date(text_value, CASE WHEN length(split_part(text_value, ' ', 2)) = 3
+                                                THEN 'FMDD Mon YYYY' ELSE 'FMDD FMMonth YYYY' END), 'YYYY-MM-DD');
+    ELSIF text_value ~* '^[a-z]+ \d{1,2}, ?\d{4}$' THEN
+        RETURN to_char(to_date(text_value, CASE WHEN length(split_part(text_value, ' ', 1)) = 3
+                                                THEN 'Mon FMDD, YYYY' ELSE 'FMMonth FMDD, YYYY' END), 'YYYY-MM-DD');
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    -- Unknown month names and impossible dates (31/02/2024)
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'articles' AND column_name = 'published_date') IN ('text', 'character varying') THEN
+        UPDATE articles
+        SET published_date = pg_temp.iso_published_date(published_date)
+        WHERE published_date !~ '^\d{4}-\d{2}-\d{2}$'
+          AND pg_temp.iso_published_date(published_date) IS NOT NULL;
+    END IF;
+END;
+$$;
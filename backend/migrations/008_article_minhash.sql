@@ -0,0 +1,16 @@
+-- MinHash signatures of canonical articles (near_duplicates.py), so an upload
+-- can find copies of its stories among articles from earlier uploads: the same
+-- wire report arrives from several newspapers in separate files.
+CREATE TABLE IF NOT EXISTS article_minhash (
+    article_id text PRIMARY KEY,
+    signature  bigint[] NOT NULL
+);
+
+-- LSH band keys: articles sharing a band key are candidate near-duplicates
+CREATE TABLE IF NOT EXISTS article_minhash_bands (
+    band_key   bigint NOT NULL,
+    article_id text NOT NULL,
+    PRIMARY KEY (band_key, article_id)
+);
+
+CREATE INDEX IF NOT EXISTS article_minhash_bands_article_id_idx ON article_minhash_bands (article_id);
@@ -0,0 +1,57 @@
+"""Store MinHash signatures (migrations/008) for canonical articles ingested before they were kept.
+
+Uploads only find copies among articles that have a stored signature; run
+this once after applying the migration. Articles that already have one are
+skipped, so the script can be re-run.
+
+Usage:
+    python raw_data_handler/backfill_minhash.py --batch-size 1000
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils import get_postgresql_connection
+from near_duplicates import minhash_signature, near_duplicate_text
+from raw_data_handler import store_signatures
+
+MISSING_SIGNATURES_QUERY = """
+    SELECT a.article_id::text, a.title, a.body
+    FROM articles AS a
+    LEFT JOIN article_minhash AS m ON m.article_id = a.article_id::text
+    WHERE a.duplicate_of IS NULL AND m.article_id IS NULL"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    conn = get_postgresql_connection()
+    total = 0
+    try:
+        with conn.cursor(name='minhash_backfill') as reader:
+            reader.itersize = args.batch_size
+            reader.execute(MISSING_SIGNATURES_QUERY)
+            while True:
+                rows = reader.fetchmany(args.batch_size)
+                if not rows:
+                    break
+                signatures = {
+                    article_id: minhash_signature(near_duplicate_text({'Title': title or '', 'Content': body or ''}))
+                    for article_id, title, body in rows
+                }
+                # A separate cursor: the named one stays open across batches
+                with conn.cursor() as writer:
+                    store_signatures(writer, signatures)
+                total += len(signatures)
+                print(f"Stored signatures for {total} articles")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+BODY, PARAGRAPH, RUN, HYPERLINK = W + 'body', W + 'p', W + 'r', W + 'hyperlink'
+RUN_TEXT = {W + 't': None, W + 'tab': '\t', W + 'br': '\n', W + 'cr': '\n'}
+
+ARTICLE_LABEL = re.compile(r'(Title:|Source:|Date:)')
+# A numbered item such as "3) ..." at the start of a paragraph ends the current article
+ARTICLE_NUMBER = re.compile(r'\s*\d{1,2}\)')
+
+
+def _in_body_run(stack):
+    """True when the innermost open element is a run of a top-level body paragraph
+
+    Matches what python-docx's Document.paragraphs exposes: paragraphs directly
+    under <w:body> (not in tables or content controls), runs directly in the
+    paragraph or inside a hyperlink.
+    """
+    depth = len(stack)
+    return (
+        stack[-1] == RUN and depth in (4, 5) and stack[1] == BODY and stack[2] == PARAGRAPH
+        and (depth == 4 or stack[3] == HYPERLINK)
+    )
+
+
+def iter_docx_paragraphs(file):
+    """Yield the text of each top-level paragraph of a .docx without loading the whole document
+
+    word/document.xml is decompressed and parsed incrementally, and every
+    finished top-level element is discarded, so memory stays bounded by the
+    largest single paragraph or table.
+    """
+    with zipfile.ZipFile(file) as archive, archive.open('word/document.xml') as xml:
+        stack = []
+        parts = []
+        body = None
+        for event, elem in ET.iterparse(xml, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem.tag)
+                if elem.tag == BODY:
+                    body = elem
+                continue
+
+            stack.pop()
+            if elem.tag in RUN_TEXT and stack and _in_body_run(stack):
+                text = RUN_TEXT[elem.tag]
+                parts.append(elem.text or '' if text is None else text)
+            elif elem.tag == PARAGRAPH and stack and stack[-1] == BODY:
+                yield ''.join(parts)
+                parts = []
+
+            if body is not None and stack and stack[-1] == BODY:
+                # A top-level element just ended; drop it to keep the tree small
+                body.clear()
+
+
+def iter_articles(file_stream):
+    """
+    Yield article dicts from a .docx one at a time while its paragraphs are parsed.
+
+    A paragraph-level state machine walks Title: -> Source: -> Date: labels;
+    the first line after Date: is the date and everything up to the next
+    Title: or numbered item is the content.
+    """
+    article, field = None, None  # field: 'Title', 'Source', 'Date' or 'Content'
+    parts = {}
+
+    def finish():
+        if article is None or field not in ('Date', 'Content'):
+            return None
+        article.update({name: "\n".join(parts.get(name, [])).strip() for name in ('Title', 'Source', 'Content')})
+        return article
+
+    for paragraph in iter_docx_paragraphs(file_stream):
+        if article is not None and field in ('Date', 'Content') and ARTICLE_NUMBER.match(paragraph):
+            done = finish()
+            if done:
+                yield done
+            article, field = None, None
+
+        segments = ARTICLE_LABEL.split(paragraph)
+        for i, segment in enumerate(segments):
+            if i % 2:  # a label
+                if segment == 'Title:':
+                    done = finish()
+                    if done:
+                        yield done
+                    article, field, parts = {"Date": ""}, 'Title', {}
+                    continue
+                if article is not None and (field, segment) in (('Title', 'Source:'), ('Source', 'Date:')):
+                    field = 'Source' if segment == 'Source:' else 'Date'
+                    continue
+            if article is None:
+                continue
+            if field == 'Date':
+                text = segment.strip()
+                if not text:
+                    continue
+                date, _, rest = text.partition("\n")
+                article["Date"], field = date.strip(), 'Content'
+                segment = rest
+            parts.setdefault(field, []).append(segment)
+
+    done = finish()
+    if done:
+        yield done
@@ -0,0 +1,110 @@
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+
+# MinHash/LSH settings: 128 permutations split into 16 bands of 8 rows puts the
+# LSH candidate threshold at a Jaccard similarity of about (1/16)^(1/8) ~ 0.71
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16
+SHINGLE_WORDS = 4
+SIMILARITY_THRESHOLD = 0.7
+_PRIME = (1 << 31) - 1
+
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingle_hashes(text, size=SHINGLE_WORDS):
+    """Hashes of the word n-grams of a text"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < size:
+        words = words + [''] * (size - len(words))
+    shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) % _PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text):
+    """MinHash signature: the minimum of each universal hash permutation over the shingles"""
+    hashes = shingle_hashes(text)
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0)
+
+
+def near_duplicate_text(article):
+    """Text an article's signature is computed over"""
+    return f"{article['Title']} {article['Content']}"
+
+
+def band_keys(signature):
+    """LSH band keys of a signature as signed 64-bit ints (article_minhash_bands.band_key)"""
+    rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+    signature = np.asarray(signature, dtype=np.uint64)
+    return [
+        int.from_bytes(hashlib.blake2b(bytes([band]) + signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes(),
+                                       digest_size=8).digest(), 'big', signed=True)
+        for band in range(NUM_BANDS)
+    ]
+
+
+def best_match(signature, candidates, threshold=SIMILARITY_THRESHOLD):
+    """Key of the candidate signature most similar to signature, if its estimated Jaccard reaches threshold
+
+    candidates maps keys to signatures; returns None when none qualifies.
+    """
+    best, best_similarity = None, threshold
+    for key, other in candidates.items():
+        similarity = np.mean(np.asarray(other, dtype=np.uint64) == signature)
+        if similarity >= best_similarity:
+            best, best_similarity = key, similarity
+    return best
+
+
+def find_duplicate_groups(texts, threshold=SIMILARITY_THRESHOLD):
+    """Group near-identical texts; returns a list of index lists, singletons included
+
+    Candidate pairs come from LSH band collisions and are kept when their
+    estimated Jaccard similarity reaches the threshold.
+    """
+    if not texts:
+        return []
+    signatures = np.stack([minhash_signature(text) for text in texts])
+    rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(NUM_BANDS):
+        buckets = defaultdict(list)
+        band_rows = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for i, key in enumerate(map(bytes, band_rows)):
+            buckets[key].append(i)
+        for members in buckets.values():
+            for other in members[1:]:
+                root, other_root = find(members[0]), find(other)
+                if root != other_root and np.mean(signatures[members[0]] == signatures[other]) >= threshold:
+                    parent[other_root] = root
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def group_near_duplicates(articles, threshold=SIMILARITY_THRESHOLD):
+    """Map each canonical article index to the indices of its near-duplicate copies
+
+    The canonical copy of a group is the one with the longest content.
+    """
+    texts = [near_duplicate_text(article) for article in articles]
+    duplicates = {}
+    for group in find_duplicate_groups(texts, threshold):
+        canonical = max(group, key=lambda i: len(articles[i]['Content']))
+        duplicates[canonical] = [i for i in group if i != canonical]
+    return duplicates
@@ -1,153 +1,474 @@
 import base64
 import datetime
 import json
+import random
+import threading
 import time
 import uuid
+from urllib.parse import unquote_plus
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from fastapi import FastAPI
-from docx import Document
 import csv
 import io
-import re
+import tempfile
 import boto3
 import traceback
-from Agent_helper import is_relevance
+from Agent_helper import THROTTLING_ERROR_CODES, content_hash, is_relevance
 from botocore.config import Config
+from botocore.exceptions import ClientError
+from psycopg2.extras import execute_values
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from Utils import get_postgresql_connection
+from Utils import pg_connection
+from Date_helper import iso_date
+from near_duplicates import band_keys, best_match, group_near_duplicates, minhash_signature, near_duplicate_text
+from docx_stream import iter_articles
 
 BUCKET_NAME = 'awstraindata'
 role = 'arn:aws:iam::269854564686:role/hackathon-comprehend-role'
-def lambda_handler(event, context):
+# Upper bound on in-flight Bedrock/Comprehend calls per invocation
+MAX_CONCURRENCY = int(os.environ.get('ENRICHMENT_CONCURRENCY', '8'))
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 0.5
+# Files of one S3 event processed in parallel
+RECORD_CONCURRENCY = int(os.environ.get('RECORD_CONCURRENCY', '4'))
+# Asynchronous Lambda invocations accept payloads up to 256 KB
+CLUSTERING_PAYLOAD_MAX_BYTES = 250 * 1024
+# A requested clustering run that has not started after this long is assumed lost and requested again
+CLUSTERING_TRIGGER_TIMEOUT_SECONDS = int(os.environ.get('CLUSTERING_TRIGGER_TIMEOUT_SECONDS', '900'))
+# Uploaded .docx files larger than this are spooled to /tmp while being parsed
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+# Shared so the cached Lambda client is reused rather than keyed on a new Config
+LAMBDA_CONFIG = Config(connect_timeout=10, read_timeout=30)
+
+_client_lock = threading.Lock()
+_clients = {}
+
+
+def get_client(service, **kwargs):
+    """Shared boto3 client per service, reused across records and warm invocations"""
+    key = (service, tuple(sorted(kwargs.items())))
+    # Client creation on the default session is not thread-safe; using a client is
+    with _client_lock:
+        if key not in _clients:
+            _clients[key] = boto3.client(service, **kwargs)
+    return _clients[key]
+
+
+def process_record(record, concurrent_records=1):
+    """Extract, enrich and store the articles of one uploaded file; returns the canonical article_ids written
+
+    concurrent_records is the number of records processed alongside this one;
+    they share the MAX_CONCURRENCY enrichment budget.
+    """
+    print(f"New record: {record}")
+    bucket = record['s3']['bucket']['name']
+    key = unquote_plus(record['s3']['object']['key'])
+    print(f"Processing file from bucket: {bucket}, key: {key}")
+    s3 = get_client('s3')
+    # Spool the object to local disk past SPOOL_MAX_BYTES instead of holding it in memory
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as stream:
+        s3.download_fileobj(bucket, key, stream)
+        stream.seek(0)
+        articles = extract_articles(stream)
+    print(f"Extracted {len(articles)} articles from {key}")
+    # Network calls run concurrently; the file is then persisted in one transaction.
+    # Concurrent records split the enrichment concurrency between them.
+    comprehend = get_client('comprehend', region_name='us-east-1')
+    rows, signatures = build_file_rows(articles, comprehend, max_workers=max(1, MAX_CONCURRENCY // concurrent_records))
+    # Borrow a pooled connection only for the write, not during enrichment
+    with pg_connection() as conn, conn.cursor() as cursor:
+        return upsert_articles(conn, cursor, rows, signatures)
+
+
+# Claims the next clustering run unless one is already requested and not yet started
+CLUSTERING_CLAIM_SQL = """
+    UPDATE clustering_trigger SET requested_at = now()
+    WHERE requested_at IS NULL
+       OR started_at >= requested_at
+       OR requested_at < now() - make_interval(secs => %s)
+    RETURNING requested_at"""
+
+def claim_clustering_run():
+    """requested_at of the run this event claimed, or None if a pending run will pick its articles up"""
+    with pg_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(CLUSTERING_CLAIM_SQL, (CLUSTERING_TRIGGER_TIMEOUT_SECONDS,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def release_clustering_run(requested_at):
+    """Withdraw a claim whose invocation failed, so the next event triggers clustering"""
+    with pg_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("UPDATE clustering_trigger SET requested_at = NULL WHERE requested_at = %s", (requested_at,))
+
+
+def trigger_clustering(article_ids):
+    """Invoke the clustering Lambda for the new article_ids, coalesced with any run still pending"""
+    requested_at = claim_clustering_run()
+    if requested_at is None:
+        print(f"Clustering run already pending, it will pick up {len(article_ids)} new articles")
+        return
+    body = json.dumps({'article_ids': article_ids})
+    if len(body) > CLUSTERING_PAYLOAD_MAX_BYTES:
+        # Too many to list; clustering falls back to scanning for unseen articles
+        print(f"{len(article_ids)} article_ids exceed the async payload limit, triggering a full scan")
+        body = json.dumps({})
+    print(f"Invoking clustering_service for {len(article_ids)} articles")
     try:
-        conn = get_postgresql_connection()
-        cursor = conn.cursor()
-        comprehend = boto3.client('comprehend', region_name='us-east-1')
-        for record in event['Records']:
-            print(f"New record: {record}")
-            bucket = record['s3']['bucket']['name']
-            key = record['s3']['object']['key']
-            print(f"Processing file from bucket: {bucket}, key: {key}")
-            s3 = boto3.client('s3')
-            print(f"Connecting to S3 bucket: {bucket}")
-            obj = s3.get_object(Bucket=bucket, Key=key)
-            stream = io.BytesIO(obj['Body'].read()) 
-            articles = extract_articles(stream)
-            print(f"Extracted {len(articles)} articles from part")
-            for article in articles:
-                print(f"Processing article: {article['Title']}")
-                # Check if article is relevant
-                is_relevant = is_relevance(article)
-                if not is_relevant:
-                    print(f"Article {article['Title']} is not relevant, skipping")
-                    continue
-                output_csv = io.StringIO()
-                writer = csv.DictWriter(output_csv, fieldnames=["Title", "Source", "Date", "Content"])
-                # writer.writeheader()
-                writer.writerow(article)
-                article_id = str(uuid.uuid4())
-                # Generate unique filename
-                csv_filename = f"input/articles-{article_id}.csv"
-                cursor.execute("""
-                        INSERT INTO articles (article_id, title, body, source, published_date)
-                        VALUES (%s, %s, %s, %s, %s)""", (article_id, article['Title'], article['Content'], article['Source'], article['Date']))
-                # Upload to S3
-                print(f"Uploading CSV to S3: {csv_filename}")
-                conn.commit() 
-                get_data_inline(output_csv.getvalue(), article_id, article['Date'], comprehend, cursor, conn)
-        cursor.close()
-        conn.close()
-        config = Config(connect_timeout=10, read_timeout=30)
-        lambda_client = boto3.client('lambda',config=config)
-        print("Invoking second Lambda function")
-        response = lambda_client.invoke(
+        response = get_client('lambda', config=LAMBDA_CONFIG).invoke(
             FunctionName='clustering_service',
-            InvocationType='Event'
+            InvocationType='Event',
+            Payload=body.encode('utf-8')
         )
-        print(f"Second Lambda function invoked: {response}")
+    except Exception:
+        release_clustering_run(requested_at)
+        raise
+    print(f"Second Lambda function invoked: {response}")
+
+
+def lambda_handler(event, context):
+    """
+    Process every S3 record of the event on a bounded thread pool.
+
+    A failing file is logged and reported without affecting the others, and
+    clustering is triggered once with the article_ids of all files, unless a
+    run requested by an earlier event has not started yet.
+    """
+    records = event.get('Records') or []
+    article_ids, failed = [], []
+    workers = max(1, min(RECORD_CONCURRENCY, len(records)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_record, record, workers): record for record in records}
+        for future in as_completed(futures):
+            record = futures[future]
+            try:
+                article_ids.extend(future.result())
+            except Exception as e:
+                traceback.print_exc()
+                key = record.get('s3', {}).get('object', {}).get('key')
+                print(f"Error processing record {key}: {e}")
+                failed.append(key)
+
+    article_ids = list(dict.fromkeys(article_ids))
+    if article_ids:
+        try:
+            trigger_clustering(article_ids)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Error invoking clustering_service: {e}")
+    return {'processed': len(records) - len(failed), 'failed': failed, 'article_ids': len(article_ids)}
+
+def call_with_backoff(fn, *args, **kwargs):
+    """Call fn, retrying throttling errors with jittered exponential backoff"""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return fn(*args, **kwargs)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in THROTTLING_ERROR_CODES or attempt == MAX_ATTEMPTS - 1:
+                raise
+            delay = BACKOFF_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random())
+            print(f"Throttled ({e.response['Error']['Code']}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+def article_to_csv(article):
+    """Single CSV row (Title, Source, Date, Content) sent to Comprehend"""
+    output_csv = io.StringIO()
+    writer = csv.DictWriter(output_csv, fieldnames=["Title", "Source", "Date", "Content"])
+    writer.writerow(article)
+    return output_csv.getvalue()
+
+# Comprehend enrichment: (single-document API, batch API, result field)
+NLP_CALLS = {
+    'entities': ('detect_entities', 'batch_detect_entities', 'Entities'),
+    'key_phrases': ('detect_key_phrases', 'batch_detect_key_phrases', 'KeyPhrases'),
+    'sentiment': ('detect_sentiment', 'batch_detect_sentiment', 'Sentiment'),
+}
+COMPREHEND_BATCH_SIZE = 25
+# ErrorList codes worth retrying; anything else (TEXT_SIZE_LIMIT_EXCEEDED,
+# UNSUPPORTED_LANGUAGE, ...) fails the same way every time
+RETRYABLE_ITEM_ERROR_CODES = {'INTERNAL_SERVER_ERROR'}
+# Documents above the batch APIs' per-document limit go through the single-document APIs
+BATCH_MAX_DOCUMENT_BYTES = 5000
+
+def batch_detect(comprehend, name, texts):
+    """Run one Comprehend batch API over up to 25 texts, retrying only the items that failed
+
+    Returns one result per text, None where the item kept failing, failed
+    with a non-retryable error code, or its retry call raised.
+    """
+    _, batch_api, field = NLP_CALLS[name]
+    results = [None] * len(texts)
+    pending = list(range(len(texts)))
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = call_with_backoff(getattr(comprehend, batch_api), TextList=[texts[i] for i in pending], LanguageCode='en')
+        except Exception as e:
+            if attempt == 0:
+                raise
+            # Keep the items that already succeeded; only the retried ones stay None
+            print(f"{batch_api}: retry of {len(pending)} documents failed, giving up on them: {e}")
+            break
+        for item in response['ResultList']:
+            results[pending[item['Index']]] = item[field]
+        errors = response.get('ErrorList', [])
+        if not errors:
+            break
+        print(f"{batch_api}: {len(errors)} of {len(pending)} documents failed ({errors[0].get('ErrorCode')}), attempt {attempt + 1}")
+        pending = [pending[error['Index']] for error in errors if error.get('ErrorCode') in RETRYABLE_ITEM_ERROR_CODES]
+        if not pending:
+            break
+        if attempt < MAX_ATTEMPTS - 1:
+            time.sleep(BACKOFF_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+    return results
+
+def detect_single(comprehend, name, text):
+    """Single-document fallback for texts too large for the batch APIs; same shape as batch_detect"""
+    single_api, _, field = NLP_CALLS[name]
+    return [call_with_backoff(getattr(comprehend, single_api), Text=text, LanguageCode='en')[field]]
+
+def enrich_articles(articles, comprehend, relevance_fn=is_relevance, max_workers=MAX_CONCURRENCY):
+    """Check relevance and run the Comprehend enrichment for articles on a bounded thread pool
+
+    Relevance checks for every article are submitted at once. Relevant articles
+    are grouped into chunks of 25 as their verdicts arrive, and each chunk is
+    sent to the batch_detect_* APIs on the same pool. Returns
+    [(article, enrichment)] for relevant articles in input order, where
+    enrichment holds 'entities', 'key_phrases' and 'sentiment'. The clients are
+    passed in so stub implementations can be used locally.
+    """
+    texts = {}
+    enrichments = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        nlp_futures = {}
+
+        def submit_chunk(chunk):
+            batchable = [i for i in chunk if len(texts[i].encode('utf-8')) <= BATCH_MAX_DOCUMENT_BYTES]
+            oversized = [i for i in chunk if i not in batchable]
+            for name in NLP_CALLS:
+                if batchable:
+                    nlp_futures[pool.submit(batch_detect, comprehend, name, [texts[i] for i in batchable])] = (batchable, name)
+                for i in oversized:
+                    nlp_futures[pool.submit(detect_single, comprehend, name, texts[i])] = ([i], name)
+
+        relevance_futures = {pool.submit(call_with_backoff, relevance_fn, article): i for i, article in enumerate(articles)}
+        chunk = []
+        for future in as_completed(relevance_futures):
+            i = relevance_futures[future]
+            title = articles[i]['Title']
+            try:
+                is_relevant = future.result()
+            except Exception as e:
+                # Retries are used up (or the check failed outright); keep the article rather than lose it
+                print(f"Relevance check failed for {title}, treating it as relevant: {e}")
+                is_relevant = True
+            if not is_relevant:
+                print(f"Article {title} is not relevant, skipping")
+                continue
+            texts[i] = article_to_csv(articles[i])
+            enrichments[i] = {}
+            chunk.append(i)
+            if len(chunk) == COMPREHEND_BATCH_SIZE:
+                submit_chunk(chunk)
+                chunk = []
+        if chunk:
+            submit_chunk(chunk)
+
+        for future in as_completed(nlp_futures):
+            indices, name = nlp_futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"Comprehend {name} failed for {len(indices)} articles: {e}")
+                results = [None] * len(indices)
+            for i, result in zip(indices, results):
+                enrichments[i][name] = result
+    return [(articles[i], enrichments[i]) for i in sorted(enrichments)]
+
+def article_id_for(article):
+    """Deterministic article_id, so reprocessing the same file updates rows instead of duplicating them
+
+    The content fingerprint keeps different stories under a recurring heading
+    ("City Briefs") with the same source and date apart. Rows stored under
+    older ids (random uuid4, or this key without the fingerprint) are not
+    rekeyed; re-uploads of them are recognised by the near-duplicate lookup
+    instead (see build_file_rows).
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{article['Source']}|{article['Date']}|{article['Title']}|{content_hash(article)}"))
+
+# Canonical articles from earlier uploads sharing an LSH band with the given keys,
+# with their signatures and the enrichment their copies reuse
+STORED_MATCHES_SQL = """
+    SELECT a.article_id::text, m.signature,
+           a.relevance_category, a.location_mentions, a.officials_involved, a.sentiment,
+           a.source, a.title
+    FROM (SELECT DISTINCT article_id FROM article_minhash_bands WHERE band_key = ANY(%s)) AS b
+    JOIN article_minhash AS m ON m.article_id = b.article_id
+    JOIN articles AS a ON a.article_id::text = b.article_id
+    WHERE a.duplicate_of IS NULL"""
+
+def find_stored_duplicates(articles, signatures):
+    """Map article index -> (article_id, enrichment columns, (source, title)) of a stored canonical article it copies
+
+    An article is never matched to its own stored row, so a re-upload updates it.
+    A failed lookup is logged and the articles are treated as new.
+    """
+    keys = sorted({key for signature in signatures.values() for key in band_keys(signature)})
+    if not keys:
+        return {}
+    try:
+        with pg_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(STORED_MATCHES_SQL, (keys,))
+            stored = {row[0]: (row[1], tuple(row[2:6]), tuple(row[6:])) for row in cursor.fetchall()}
     except Exception as e:
-        traceback.print_exc()
-        print(f"Error processing event: {e}")
-
-def get_data_inline(data, articles_id, article_date, comprehend, cursor, conn):
-    print(f"Processing data for article ID: {articles_id}")
-    entities_response = comprehend.detect_entities(
-                Text=data,
-                LanguageCode='en'
-            )
-    print(f"Entities detected: {entities_response['Entities']}")
-    add_entities_to_article(conn, cursor, articles_id, entities_response['Entities'])
-    response = comprehend.detect_key_phrases(
-            Text=data,
-            LanguageCode='en'
-        )
-    print(f"Key phrases detected: {response['KeyPhrases']}")
-    for keyPhrase in response['KeyPhrases']:
-        keyPhrase['Type'] = 'KeyPhrase'
-    add_keyphrase_to_article(conn, cursor, articles_id, article_date, response['KeyPhrases'])
-    sentiment_response = comprehend.detect_sentiment(
-                Text=data,
-                LanguageCode='en'
+        print(f"Near-duplicate lookup against stored articles failed, treating articles as new: {e}")
+        return {}
+    matches = {}
+    for i, signature in signatures.items():
+        own_id = article_id_for(articles[i])
+        match = best_match(signature, {article_id: entry[0] for article_id, entry in stored.items() if article_id != own_id})
+        if match is not None:
+            matches[i] = (match,) + stored[match][1:]
+    return matches
+
+def build_file_rows(articles, comprehend, max_workers=MAX_CONCURRENCY):
+    """Enrich one canonical copy per near-duplicate group; the other copies reuse its enrichment
+
+    Copies are still stored (one row per source, for comparison) with
+    duplicate_of pointing at the canonical article, which keeps them out of
+    the clustering index. Groups that copy a canonical article from an earlier
+    upload are stored as its copies without being enriched again.
+
+    Returns (rows, {article_id: MinHash signature}) for the new canonical rows.
+    """
+    duplicates = group_near_duplicates(articles)
+    canonical = sorted(duplicates)
+    print(f"{len(articles)} articles form {len(canonical)} near-duplicate groups")
+    signatures = {i: minhash_signature(near_duplicate_text(articles[i])) for i in canonical}
+    stored = find_stored_duplicates(articles, signatures)
+    print(f"{len(stored)} groups copy articles from earlier uploads")
+    rows = []
+    for i, (stored_id, columns, origin) in stored.items():
+        for article in [articles[i]] + [articles[j] for j in duplicates[i]]:
+            # Same source and title: the stored row is this article under an older id, not another paper's copy
+            if article_id_for(article) != stored_id and (article['Source'], article['Title']) != origin:
+                rows.append(build_copy_row(article, columns, stored_id))
+
+    fresh = [i for i in canonical if i not in stored]
+    copies = {id(articles[i]): [articles[j] for j in duplicates[i]] for i in fresh}
+    for article, enrichment in enrich_articles([articles[i] for i in fresh], comprehend, max_workers=max_workers):
+        row = build_article_row(article, enrichment)
+        rows.append(row)
+        for copy in copies[id(article)]:
+            if article_id_for(copy) != row[0]:
+                rows.append(build_article_row(copy, enrichment, duplicate_of=row[0]))
+    return rows, {article_id_for(articles[i]): signatures[i] for i in fresh}
+
+def build_article_row(article, enrichment, duplicate_of=None):
+    """Column values for one article with its enrichment, in ARTICLE_UPSERT_COLUMNS order"""
+    article_id = article_id_for(article)
+    print(f"Processing data for article ID: {article_id}")
+    location_mentions, officials_involved = entity_columns(enrichment.get('entities') or [])
+    relevance_category = keyphrase_column(enrichment.get('key_phrases') or [])
+    sentiment = enrichment.get('sentiment') or None
+    print(f"Sentiment detected: {sentiment}")
+    # Stored as YYYY-MM-DD so the feed's date filters and ordering compare dates, not day-first strings
+    published_date = iso_date(article['Date'])
+    if published_date is None:
+        print(f"Unrecognised date {article['Date']!r} for article ID: {article_id}, stored without published_date")
+    return (
+        article_id, article['Title'], article['Content'], article['Source'], published_date,
+        relevance_category, location_mentions, officials_involved, sentiment, duplicate_of,
     )
-    print(f"Sentiment detected: {sentiment_response['Sentiment']}")
-    sentiment = sentiment_response['Sentiment']
-    if sentiment:
-        cursor.execute("""update articles set sentiment = %s where article_id = %s""", (sentiment, articles_id))
+
+def build_copy_row(article, enrichment_columns, duplicate_of):
+    """Row for a copy of a stored article, reusing its stored enrichment columns"""
+    row = build_article_row(article, {}, duplicate_of=duplicate_of)
+    # relevance_category, location_mentions, officials_involved, sentiment
+    return row[:5] + tuple(enrichment_columns) + row[9:]
+
+ARTICLE_UPSERT_COLUMNS = (
+    'article_id', 'title', 'body', 'source', 'published_date',
+    'relevance_category', 'location_mentions', 'officials_involved', 'sentiment', 'duplicate_of',
+)
+# Enrichment columns keep their stored value when a re-run could not compute them
+ARTICLE_UPSERT_SQL = f"""
+    INSERT INTO articles ({', '.join(ARTICLE_UPSERT_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (article_id) DO UPDATE SET
+        title = EXCLUDED.title,
+        body = EXCLUDED.body,
+        source = EXCLUDED.source,
+        published_date = EXCLUDED.published_date,
+        relevance_category = COALESCE(EXCLUDED.relevance_category, articles.relevance_category),
+        location_mentions = COALESCE(EXCLUDED.location_mentions, articles.location_mentions),
+        officials_involved = COALESCE(EXCLUDED.officials_involved, articles.officials_involved),
+        sentiment = COALESCE(EXCLUDED.sentiment, articles.sentiment),
+        duplicate_of = EXCLUDED.duplicate_of"""
+
+def upsert_articles(conn, cursor, rows, signatures=None):
+    """Write all enriched articles of a file with one multi-row upsert in one transaction
+
+    The MinHash signatures of the canonical rows are stored alongside
+    (migrations/008), so later uploads can find copies of them.
+    Returns the article_ids of the canonical (non-duplicate) rows written.
+    """
+    # A row may only be upserted once per statement; keep the last copy of each article_id
+    rows = list({row[0]: row for row in rows}.values())
+    if not rows:
+        return []
+    canonical_ids = [row[0] for row in rows if row[-1] is None]
+    signatures = {article_id: signatures[article_id] for article_id in canonical_ids if article_id in (signatures or {})}
+    try:
+        execute_values(cursor, ARTICLE_UPSERT_SQL, rows, page_size=len(rows))
+        if signatures:
+            store_signatures(cursor, signatures)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"Upserted {len(rows)} articles")
+    return canonical_ids
+
+def store_signatures(cursor, signatures):
+    """Replace the stored MinHash signature and band keys of each article"""
+    article_ids = list(signatures)
+    execute_values(
+        cursor,
+        """INSERT INTO article_minhash (article_id, signature) VALUES %s
+           ON CONFLICT (article_id) DO UPDATE SET signature = EXCLUDED.signature""",
+        [(article_id, [int(value) for value in signature]) for article_id, signature in signatures.items()])
+    cursor.execute("DELETE FROM article_minhash_bands WHERE article_id = ANY(%s)", (article_ids,))
+    execute_values(
+        cursor,
+        "INSERT INTO article_minhash_bands (band_key, article_id) VALUES %s ON CONFLICT DO NOTHING",
+        [(key, article_id) for article_id, signature in signatures.items() for key in band_keys(signature)])
 
 def extract_articles(file_stream):
     print(f"Extracting articles from file stream")
-    doc = Document(file_stream)
-    print(f"Document loaded with {len(doc.paragraphs)} paragraphs")
-    text = "\n".join(p.text for p in doc.paragraphs)
-    pattern = re.compile(
-        r'Title:\s*(.*?)\s*Source:\s*(.*?)\s*Date:\s*(.*?)\s*(?=(?:\d{1,2}\)|Title:)|\Z)',
-        re.DOTALL
-    )
-    matches = pattern.findall(text)
-    print(f"Found {len(matches)} matches in the document")
     articles = []
-    for match in matches:
-        print(f"Processing match: {match}")
-        title = match[0].strip()
-        source = match[1].strip()
-        date_parts = match[2].strip().split("\n", 1)
-        date = date_parts[0].strip()
-        content = date_parts[1].strip() if len(date_parts) > 1 else ""
-        print(f"Extracted article - Title: {title}, Source: {source}, Date: {date}, Content length: {len(content)}")
-        articles.append({
-            "Title": title,
-            "Source": source,
-            "Date": date,
-            "Content": content
-            })
+    for article in iter_articles(file_stream):
+        print(f"Extracted article - Title: {article['Title']}, Source: {article['Source']}, Date: {article['Date']}, Content length: {len(article['Content'])}")
+        articles.append(article)
     return articles
 
 
-def add_keyphrase_to_article(conn, cursor, article_id, article_date, entities):
-    entities_text = [entity['Text'] for entity in entities]
-    print(f"Entities to be added: {entities_text}")
-    print(f"article_id: {article_id}")
-    if entities_text:
-        relevance_category = ','.join(map(str, entities_text))
-        cursor.execute("""update articles set relevance_category = %s where article_id = %s""", (relevance_category, article_id))
+def keyphrase_column(key_phrases):
+    """relevance_category value: comma-joined key phrases, or None"""
+    phrases_text = [phrase['Text'] for phrase in key_phrases]
+    print(f"Key phrases to be added: {phrases_text}")
+    return ','.join(map(str, phrases_text)) or None
 
-def add_entities_to_article(conn, cursor, article_id, entities):
+def entity_columns(entities):
+    """(location_mentions, officials_involved) values from Comprehend entities, None when empty"""
     entities_text = [entity['Text'] for entity in entities]
     print(f"Entities to be added: {entities_text}")
     location_mentions = []
     officials_involved = []
-    print(f"article_id: {article_id}")
     for entity in entities:
         if entity['Type'] == 'LOCATION':
             location_mentions.append(entity['Text'].lower())
         elif entity['Type'] == 'PERSON' or entity['Type'] == 'ORGANIZATION':
             officials_involved.append(entity['Text'].lower())
-    print(f"Processing entity: {entity}")
-    if location_mentions:
-        location_mentions = ','.join(map(str, location_mentions))
-        cursor.execute("""update articles set location_mentions = %s where article_id = %s""", (location_mentions, article_id))
-
-    if officials_involved:
-        officials_involved = ','.join(map(str, officials_involved))
-        cursor.execute("""update articles set officials_involved = %s where article_id = %s""", (officials_involved, article_id))
\ No newline at end of file
+    return ','.join(map(str, location_mentions)) or None, ','.join(map(str, officials_involved)) or None